@@ -6,10 +6,27 @@ providing a read-only view of command execution history with filtering and searc
 capabilities.
 """
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 
 from .models import CommandExecution
 
 
+class CommandExecutionChangeList(ChangeList):
+    """
+    Changelist that only loads the columns shown in list_display.
+
+    The output, error_message and parameters columns can be large and are only
+    needed on the detail page, so they are not fetched for every listed row.
+    """
+
+    def get_queryset(self, request, *args, **kwargs):
+        queryset = super().get_queryset(request, *args, **kwargs)
+        # list_display may also name callables, admin methods or model
+        # properties, which only() would reject
+        field_names = {field.name for field in self.model._meta.concrete_fields}
+        return queryset.only(*[name for name in self.list_display if name in field_names])
+
+
 @admin.register(CommandExecution)
 class CommandExecutionAdmin(admin.ModelAdmin):
     """
@@ -38,3 +55,6 @@ class CommandExecutionAdmin(admin.ModelAdmin):
     ]
     ordering = ['-executed_at']
     date_hierarchy = 'executed_at'
+
+    def get_changelist(self, request, **kwargs):
+        return CommandExecutionChangeList
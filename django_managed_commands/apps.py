@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate
 
 
 class DjangoManagedCommandsConfig(AppConfig):
@@ -11,3 +12,19 @@ class DjangoManagedCommandsConfig(AppConfig):
     name = "django_managed_commands"
     verbose_name = "Django Managed Commands"
     default_auto_field = "django.db.models.BigAutoField"
+
+    def ready(self):
+        from .models import CommandExecution
+        from .utils import _forget_deleted_execution, _forget_flushed_executions
+
+        # Keep should_run_command()'s process-wide cache in step with deleted rows
+        post_delete.connect(
+            _forget_deleted_execution,
+            sender=CommandExecution,
+            dispatch_uid="django_managed_commands.forget_deleted_execution",
+        )
+        post_migrate.connect(
+            _forget_flushed_executions,
+            sender=self,
+            dispatch_uid="django_managed_commands.forget_flushed_executions",
+        )
@@ -8,21 +8,31 @@ This module provides the ManagedCommand base class that handles:
 - Run-once command support
 """
 
+import contextlib
+import json
 import time
 
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
+from .models import CommandExecution
 from .utils import record_command_execution, should_run_command
 
 
+def _coerce_output(result):
+    """Convert an execute_command() return value into the output string to store."""
+    if not result:
+        return ""
+    return result if isinstance(result, str) else str(result)
+
+
 class ManagedCommand(BaseCommand):
     """
     Base class for Django management commands with automatic tracking.
 
     Subclass this instead of BaseCommand to get:
     - Automatic execution timing
-    - Database transaction wrapping (all-or-nothing)
+    - Database transaction wrapping (all-or-nothing; set `atomic = False` to opt out)
     - Execution recording in CommandExecution model
     - Run-once support via `run_once = True`
     - Built-in --dry-run flag (executes but rolls back transaction)
@@ -33,7 +43,7 @@ class ManagedCommand(BaseCommand):
             run_once = False  # Set to True for one-time commands
 
             def execute_command(self, *args, **options):
-                # Your command logic here - runs inside a transaction
+                # Your command logic here - runs inside a transaction unless atomic = False
                 self.stdout.write("Doing work...")
                 self.stdout.write(self.style.SUCCESS("Done!"))
     """
@@ -41,21 +51,32 @@ class ManagedCommand(BaseCommand):
     # Set to True if this command should only run once successfully
     run_once = False
 
+    # Set to True to write execution records (successful and failed) in batches from
+    # a background thread (see utils.flush_command_executions). Ignored for run_once
+    # commands, whose records must be visible to should_run_command right away.
+    buffer_executions = False
+
+    # Set to False to run execute_command outside a transaction (e.g. read-only commands).
+    # --dry-run always uses a transaction, since it relies on rolling it back.
+    atomic = True
+
     # Override to customize command name, otherwise auto-derived from module path
     # e.g., "myapp.management.commands.my_command" -> "myapp.my_command"
     command_name = None
 
     # Options to exclude from serialization (non-JSON-serializable or internal)
-    _non_serializable_options = (
-        "stdout",
-        "stderr",
-        "no_color",
-        "force_color",
-        "skip_checks",
-        "settings",
-        "pythonpath",
-        "traceback",
-        "dry_run",
+    _non_serializable_options = frozenset(
+        {
+            "stdout",
+            "stderr",
+            "no_color",
+            "force_color",
+            "skip_checks",
+            "settings",
+            "pythonpath",
+            "traceback",
+            "dry_run",
+        }
     )
 
     def add_arguments(self, parser):
@@ -76,15 +97,26 @@ class ManagedCommand(BaseCommand):
         if self.command_name:
             return self.command_name
 
-        module = self.__class__.__module__
+        # Cached per class (not inherited), since subclasses may live in other modules
+        cls = type(self)
+        cached = cls.__dict__.get("_cached_command_name")
+        if cached:
+            return cached
+
+        module = cls.__module__
         parts = module.split(".")
         # Expected format: myapp.management.commands.command_name
         if len(parts) >= 4 and parts[-3:-1] == ["management", "commands"]:
-            return f"{parts[-4]}.{parts[-1]}"
-        return module  # Fallback to full module path
+            name = f"{parts[-4]}.{parts[-1]}"
+        else:
+            name = module  # Fallback to full module path
+        cls._cached_command_name = name
+        return name
 
     def get_serializable_options(self, options):
         """Filter out non-serializable options for storage."""
+        if not options:
+            return {}
         return {k: v for k, v in options.items() if k not in self._non_serializable_options}
 
     def handle(self, *args, **options):
@@ -94,9 +126,13 @@ class ManagedCommand(BaseCommand):
         This method:
         1. Checks run_once condition
         2. Starts timing
-        3. Runs execute_command inside a database transaction
-        4. Records execution (success or failure) outside the transaction
-        5. Re-raises any exceptions after recording
+        3. Runs execute_command inside a database savepoint (unless atomic = False)
+        4. Records execution (success or failure) in the enclosing transaction,
+           after a failed savepoint has been rolled back. Buffered records are
+           queued instead, so execute_command gets a plain transaction. Options
+           that cannot be stored are rejected before execute_command runs
+        5. Re-raises any exceptions after recording; if recording a failure
+           itself raises, that error is chained to the original one
         """
         cmd_name = self.get_command_name()
         dry_run = options.get("dry_run", False)
@@ -113,57 +149,78 @@ class ManagedCommand(BaseCommand):
         if dry_run:
             self.stdout.write(self.style.WARNING("DRY RUN - all database changes will be rolled back"))
 
-        start_time = time.time()
+        start_time = time.perf_counter()
         serializable_options = self.get_serializable_options(options)
-
-        try:
-            with transaction.atomic():
-                result = self.execute_command(*args, **options)
-                if dry_run:
-                    transaction.set_rollback(True)
-
-            duration = time.time() - start_time
-
-            if not dry_run:
+        record = not dry_run
+        # Buffered records are only queued here, so they gain nothing from sharing the work's transaction
+        record_inline = self.run_once or not self.buffer_executions
+        result = error = None
+
+        if record:
+            # The success record shares the work's transaction, so an option the
+            # parameters field cannot encode would roll back finished work. Encode
+            # up front (some backends only encode when the INSERT runs) to fail first.
+            json.dumps(serializable_options, cls=CommandExecution._meta.get_field("parameters").encoder)
+
+        # The work and its execution record share one transaction: execute_command
+        # runs in a savepoint, which is rolled back on failure while the failure
+        # record is still committed. A successful run costs a single COMMIT.
+        with transaction.atomic() if self.atomic and record and record_inline else contextlib.nullcontext():
+            try:
+                with transaction.atomic() if self.atomic or dry_run else contextlib.nullcontext():
+                    result = self.execute_command(*args, **options)
+                    if dry_run:
+                        transaction.set_rollback(True)
+            except Exception as e:
+                error = e
+                error_message = f"{type(e).__name__}: {str(e)}"
+
+            duration = time.perf_counter() - start_time
+
+            if record and error is None:
                 record_command_execution(
                     command_name=cmd_name,
                     success=True,
                     parameters=serializable_options,
-                    output=str(result) if result else "",
-                    duration=duration,
-                    run_once=self.run_once,
-                )
-
-            success_msg = f"Command {cmd_name} completed successfully in {duration:.2f}s"
-            if dry_run:
-                success_msg += " (dry run - changes rolled back)"
-            self.stdout.write(self.style.SUCCESS(success_msg))
-            return result
-
-        except Exception as e:
-            # Record failed execution (outside transaction - always recorded)
-            duration = time.time() - start_time
-            error_message = f"{type(e).__name__}: {str(e)}"
-
-            if not dry_run:
-                record_command_execution(
-                    command_name=cmd_name,
-                    success=False,
-                    parameters=serializable_options,
-                    error_message=error_message,
+                    output=_coerce_output(result),
                     duration=duration,
                     run_once=self.run_once,
+                    immediate=record_inline,
                 )
-
+            elif record:
+                # Buffered commands queue the failure so the exception propagates without waiting on the INSERT
+                try:
+                    record_command_execution(
+                        command_name=cmd_name,
+                        success=False,
+                        parameters=serializable_options,
+                        error_message=error_message,
+                        duration=duration,
+                        run_once=self.run_once,
+                        immediate=record_inline,
+                    )
+                except Exception as record_error:
+                    # Recording runs outside the except block, so chain explicitly to keep the original error
+                    raise record_error from error
+
+        if error is not None:
             self.stdout.write(self.style.ERROR(f"Command {cmd_name} failed: {error_message}"))
-            raise
+            raise error
+
+        success_msg = f"Command {cmd_name} completed successfully in {duration:.2f}s"
+        if dry_run:
+            success_msg += " (dry run - changes rolled back)"
+        self.stdout.write(self.style.SUCCESS(success_msg))
+        return result
 
     def execute_command(self, *args, **options):
         """
         Override this method with your command logic.
 
         This method runs inside a database transaction. If an exception is raised,
-        all database changes are rolled back automatically.
+        all database changes are rolled back automatically. Commands that set
+        atomic = False run without a transaction (except under --dry-run), so
+        changes made before an exception are kept.
 
         Args:
             *args: Positional arguments passed to the command
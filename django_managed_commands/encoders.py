@@ -0,0 +1,68 @@
+"""
+JSON encoders for django_managed_commands.
+
+This module provides the encoder used by the CommandExecution.parameters field.
+When the optional orjson package is installed, parameters are serialized with it
+instead of the standard library json module.
+"""
+import dataclasses
+import enum
+import math
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class ParametersJSONEncoder(DjangoJSONEncoder):
+    """
+    JSON encoder that serializes with orjson when it is available.
+
+    orjson encodes the common dict/list/str/number payloads in C, several times
+    faster than the json module. Values orjson rejects (e.g. dicts with non-string
+    keys) fall back to DjangoJSONEncoder, as does everything when orjson is not
+    installed. Dates, times, decimals and other types orjson does not handle the
+    same way are passed to DjangoJSONEncoder.default(), so both paths store them
+    in the same format. The fallback in turn encodes enums and dataclasses, and
+    stores NaN and infinities as null, as orjson does.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # NaN/Infinity are not valid JSON; raise instead so encode() can swap in null
+        kwargs["allow_nan"] = False
+        super().__init__(*args, **kwargs)
+
+    def default(self, o):
+        if isinstance(o, enum.Enum):
+            return o.value
+        if dataclasses.is_dataclass(o) and not isinstance(o, type):
+            return dataclasses.asdict(o)
+        return super().default(o)
+
+    def encode(self, o):
+        if orjson is not None:
+            try:
+                return orjson.dumps(o, default=self.default, option=orjson.OPT_PASSTHROUGH_DATETIME).decode()
+            except TypeError:
+                pass
+        try:
+            return super().encode(o)
+        except ValueError as e:
+            # Only rewrite for non-finite floats, not e.g. circular references
+            if not str(e).startswith("Out of range float values"):
+                raise
+            return super().encode(_null_non_finite(o))
+
+
+def _null_non_finite(o):
+    """Return a copy of o with NaN and infinite floats replaced by None."""
+    if isinstance(o, float):
+        return o if math.isfinite(o) else None
+    if isinstance(o, dict):
+        return {k: _null_non_finite(v) for k, v in o.items()}
+    if isinstance(o, (list, tuple)):
+        return [_null_non_finite(v) for v in o]
+    return o
@@ -5,11 +5,81 @@ Generates a new Django management command with built-in execution tracking.
 Creates both the command file and a corresponding test file.
 """
 
+import functools
 from pathlib import Path
+from string import Template
 
 from django.apps import apps
 from django.core.management.base import BaseCommand, CommandError
 
+# Directory holding the command and test templates
+TEMPLATES_DIR = Path(__file__).parent.parent.parent / "templates"
+
+
+@functools.lru_cache(maxsize=None)
+def _load_template(name):
+    """Read a template file as a string.Template, caching it for the rest of the process."""
+    return Template((TEMPLATES_DIR / name).read_text())
+
+
+# Test case appended to the generated test file for run_once commands
+RUN_ONCE_TEST = Template(
+    """    def test_run_once_prevents_reexecution(self):
+        call_command("$command_name")
+        first_execution = CommandExecution.objects.first()
+        self.assertTrue(first_execution.success)
+
+        out = StringIO()
+        call_command("$command_name", stdout=out)
+
+        self.assertEqual(CommandExecution.objects.count(), 1)
+        self.assertIn("Skipping", out.getvalue())"""
+)
+
+# Test case appended to the generated test file for repeatable commands
+MULTI_RUN_TEST = Template(
+    """    def test_can_run_multiple_times(self):
+        call_command("$command_name")
+        call_command("$command_name")
+        call_command("$command_name")
+
+        self.assertEqual(
+            CommandExecution.objects.filter(command_name="$app_name.$command_name").count(),
+            3,
+        )"""
+)
+
+
+def _class_name(command_name):
+    """Return the TitleCase class name for a command, e.g. 'my_command' -> 'MyCommand'."""
+    return "".join(word.capitalize() for word in command_name.split("_"))
+
+
+def render_command(app_name, command_name, run_once=False):
+    """
+    Render the source of a generated management command.
+
+    Args:
+        app_name: Name of the Django app the command belongs to
+        command_name: Name of the management command
+        run_once: Whether the command should set run_once = True
+
+    Returns:
+        The command module source as a string
+    """
+    command_content = _load_template("command_template.py.txt").substitute(
+        command_name=command_name,
+        app_name=app_name,
+        class_name=_class_name(command_name),
+    )
+
+    # Handle run_once flag
+    if run_once:
+        # Replace 'run_once = False' with 'run_once = True'
+        command_content = command_content.replace("run_once = False", "run_once = True")
+
+    return command_content
+
 
 class Command(BaseCommand):
     """
@@ -56,6 +126,23 @@ class Command(BaseCommand):
             help="Overwrite existing files if they exist",
         )
 
+    def validate_command_name(self, command_name):
+        """
+        Ensure the command name can be used as a Python module name.
+
+        Args:
+            command_name: Name of the management command to create
+
+        Raises:
+            CommandError: If command_name is not a valid Python identifier
+        """
+        if not command_name.isidentifier():
+            raise CommandError(
+                f"Command name '{command_name}' is not a valid Python identifier. "
+                f"Use only letters, numbers, and underscores. "
+                f"Cannot start with a number."
+            )
+
     def handle(self, *args, **options):
         """
         Main command logic to generate management command files.
@@ -88,13 +175,7 @@ class Command(BaseCommand):
                 f"Make sure the app is installed and configured correctly."
             )
 
-        # Validate command_name is a valid Python identifier
-        if not command_name.isidentifier():
-            raise CommandError(
-                f"Command name '{command_name}' is not a valid Python identifier. "
-                f"Use only letters, numbers, and underscores. "
-                f"Cannot start with a number."
-            )
+        self.validate_command_name(command_name)
 
         # ============================================
         # FIND APP DIRECTORY
@@ -111,16 +192,13 @@ class Command(BaseCommand):
         commands_dir = management_dir / "commands"
         tests_dir = app_path / "tests"
 
-        # Create directories and __init__.py files
-        management_dir.mkdir(parents=True, exist_ok=True)
-        (management_dir / "__init__.py").touch(exist_ok=True)
-
+        # Create directories (commands/ implies management/) and __init__.py files
         commands_dir.mkdir(parents=True, exist_ok=True)
-        (commands_dir / "__init__.py").touch(exist_ok=True)
-
-        # Create tests directory if it doesn't exist
         tests_dir.mkdir(parents=True, exist_ok=True)
-        (tests_dir / "__init__.py").touch(exist_ok=True)
+        for package_dir in (management_dir, commands_dir, tests_dir):
+            init_file = package_dir / "__init__.py"
+            if not init_file.exists():
+                init_file.write_text("")
 
         # ============================================
         # CHECK EXISTING FILES
@@ -139,71 +217,33 @@ class Command(BaseCommand):
         # LOAD TEMPLATES
         # ============================================
 
-        # Find templates directory (relative to this file)
-        templates_dir = Path(__file__).parent.parent.parent / "templates"
-        command_template_path = templates_dir / "command_template.py.txt"
-        test_template_path = templates_dir / "test_template.py.txt"
-
-        # Read templates
+        # Loaded (and cached) here so a missing template is reported before rendering
         try:
-            with open(command_template_path, "r") as f:
-                command_template = f.read()
+            _load_template("command_template.py.txt")
         except FileNotFoundError:
-            raise CommandError(f"Command template not found at {command_template_path}")
+            raise CommandError(f"Command template not found at {TEMPLATES_DIR / 'command_template.py.txt'}")
 
         try:
-            with open(test_template_path, "r") as f:
-                test_template = f.read()
+            test_template = _load_template("test_template.py.txt")
         except FileNotFoundError:
-            raise CommandError(f"Test template not found at {test_template_path}")
+            raise CommandError(f"Test template not found at {TEMPLATES_DIR / 'test_template.py.txt'}")
 
         # ============================================
         # RENDER TEMPLATES
         # ============================================
 
-        # Generate class name (TitleCase from command_name)
-        # e.g., 'my_command' -> 'MyCommand'
-        class_name = "".join(word.capitalize() for word in command_name.split("_"))
-
-        # Substitute placeholders in command template
-        command_content = command_template.format(
-            command_name=command_name,
-            app_name=app_name,
-            class_name=class_name,
-        )
-
-        # Handle run_once flag
-        if run_once:
-            # Replace 'run_once = False' with 'run_once = True'
-            command_content = command_content.replace("run_once = False", "run_once = True")
+        command_content = render_command(app_name, command_name, run_once)
 
         if run_once:
-            run_behavior_test = """    def test_run_once_prevents_reexecution(self):
-        call_command("{command_name}")
-        first_execution = CommandExecution.objects.first()
-        self.assertTrue(first_execution.success)
-
-        out = StringIO()
-        call_command("{command_name}", stdout=out)
-
-        self.assertEqual(CommandExecution.objects.count(), 1)
-        self.assertIn("Skipping", out.getvalue())""".format(command_name=command_name)
+            run_behavior_test = RUN_ONCE_TEST.substitute(command_name=command_name)
         else:
-            run_behavior_test = """    def test_can_run_multiple_times(self):
-        call_command("{command_name}")
-        call_command("{command_name}")
-        call_command("{command_name}")
-
-        self.assertEqual(
-            CommandExecution.objects.filter(command_name="{app_name}.{command_name}").count(),
-            3,
-        )""".format(command_name=command_name, app_name=app_name)
+            run_behavior_test = MULTI_RUN_TEST.substitute(command_name=command_name, app_name=app_name)
 
         # Substitute placeholders in test template
-        test_content = test_template.format(
+        test_content = test_template.substitute(
             command_name=command_name,
             app_name=app_name,
-            class_name=class_name,
+            class_name=_class_name(command_name),
             run_behavior_test=run_behavior_test,
         )
 
@@ -211,13 +251,8 @@ class Command(BaseCommand):
         # WRITE FILES
         # ============================================
 
-        # Write command file
-        with open(command_file_path, "w") as f:
-            f.write(command_content)
-
-        # Write test file
-        with open(test_file_path, "w") as f:
-            f.write(test_content)
+        command_file_path.write_text(command_content)
+        test_file_path.write_text(test_content)
 
         # ============================================
         # OUTPUT SUCCESS MESSAGE
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-15 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_managed_commands', '0002_commandexecution_run_once_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commandexecution',
+            index=models.Index(fields=['command_name', '-executed_at'], name='cmd_name_exec_at_idx'),
+        ),
+    ]
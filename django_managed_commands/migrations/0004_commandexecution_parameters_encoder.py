@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-15 14:19
+
+from django.db import migrations, models
+
+import django_managed_commands.encoders
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_managed_commands', '0003_commandexecution_history_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='commandexecution',
+            name='parameters',
+            field=models.JSONField(blank=True, encoder=django_managed_commands.encoders.ParametersJSONEncoder, help_text='Command parameters as JSON', null=True),
+        ),
+    ]
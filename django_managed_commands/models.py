@@ -6,6 +6,8 @@ commands are run, their parameters, output, and execution status.
 """
 from django.db import models
 
+from .encoders import ParametersJSONEncoder
+
 
 class CommandExecution(models.Model):
     """
@@ -32,6 +34,7 @@ class CommandExecution(models.Model):
     parameters = models.JSONField(
         null=True,
         blank=True,
+        encoder=ParametersJSONEncoder,
         help_text="Command parameters as JSON"
     )
     output = models.TextField(
@@ -66,3 +69,9 @@ class CommandExecution(models.Model):
         ordering = ["-executed_at"]
         verbose_name = "Command Execution"
         verbose_name_plural = "Command Executions"
+        indexes = [
+            # Serves the "latest executions of a command" lookups, e.g. utils.get_command_history()
+            models.Index(fields=["command_name", "-executed_at"], name="cmd_name_exec_at_idx"),
+            # Serves the run_once lookup in utils.should_run_command()
+            models.Index(fields=["command_name", "run_once", "success"], name="cmd_exec_run_once_idx"),
+        ]
@@ -1,7 +1,95 @@
 """Utility functions for django_managed_commands."""
 
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router, transaction
+
 from .models import CommandExecution
 
+logger = logging.getLogger(__name__)
+
+# Maximum number of buffered executions written with a single bulk INSERT
+BATCH_SIZE = 100
+
+# Default for the MANAGED_COMMANDS_MAX_OUTPUT setting: the maximum number of
+# characters of output/error_message stored per execution
+DEFAULT_MAX_OUTPUT = 65536
+
+# Executions recorded with immediate=False, written by a background thread
+_write_queue = queue.Queue()
+_writer_thread = None
+_WRITER_LOCK = threading.Lock()
+
+# Queued by _stop_writer() to make the background thread exit
+_STOP_WRITER = object()
+
+# Executions the background writer failed to save since the last flush
+_dropped_executions = 0
+
+# Command names known to have a committed successful run_once execution, mapped
+# to the should_run_command() result (always False). Entries are dropped when
+# executions are deleted or the table is flushed (see apps.ready()).
+_should_run_cache = {}
+
+
+def _remember_ran_once(command_name):
+    """Cache a successful run_once execution once it has been committed."""
+    # Deferring to on_commit keeps rolled back executions (e.g. inside a test
+    # case transaction) out of the cache. Outside a transaction this runs now.
+    transaction.on_commit(lambda: _should_run_cache.__setitem__(command_name, False))
+
+
+def preload_should_run_cache():
+    """
+    Warm the should_run_command() cache for every command with a single query.
+
+    Processes that invoke many run_once commands (batch runners, orchestration
+    scripts) can call this once up front so that each subsequent
+    should_run_command() call for a command that already ran is answered from
+    memory, instead of issuing one query per command.
+
+    Returns:
+        int: The number of command names found to have already run once.
+    """
+    names = list(
+        CommandExecution.objects.filter(run_once=True, success=True)
+        .order_by()
+        .values_list("command_name", flat=True)
+        .distinct()
+    )
+    for name in names:
+        _remember_ran_once(name)
+    return len(names)
+
+
+def clear_should_run_cache():
+    """Forget all cached should_run_command() results for this process."""
+    _should_run_cache.clear()
+
+
+def _forget_deleted_execution(sender, instance, **kwargs):
+    """post_delete receiver: re-check a command whose execution was deleted on its next run."""
+    _should_run_cache.pop(instance.command_name, None)
+
+
+def _forget_flushed_executions(sender, **kwargs):
+    """post_migrate receiver: the flush command empties the table and then emits post_migrate."""
+    _should_run_cache.clear()
+
+
+def _truncate(text):
+    """Cut text down to the MANAGED_COMMANDS_MAX_OUTPUT setting, noting how much was dropped."""
+    limit = getattr(settings, "MANAGED_COMMANDS_MAX_OUTPUT", DEFAULT_MAX_OUTPUT)
+    if not text or limit is None or len(text) <= limit:
+        return text
+    return f"{text[:limit]}\n[truncated {len(text) - limit} characters]"
+
 
 def record_command_execution(
     command_name,
@@ -11,6 +99,8 @@ def record_command_execution(
     error_message="",
     duration=None,
     run_once=False,
+    immediate=True,
+    fast=False,
 ):
     """
     Record a command execution in the database.
@@ -19,6 +109,18 @@ def record_command_execution(
     This function is used to track when management commands are executed,
     their success status, and any relevant metadata.
 
+    With immediate=False the execution is queued instead and written in batches
+    by a background thread, keeping the INSERT off the caller's critical path.
+    Use flush_command_executions() to wait until queued executions are written.
+
+    With fast=True the row is written with a single INSERT through a raw cursor,
+    bypassing Model.save() and the pre_save/post_save signals. Use it for
+    fire-and-forget recording; the returned instance has no primary key.
+
+    Output and error messages longer than the MANAGED_COMMANDS_MAX_OUTPUT setting
+    (64K characters by default, None to disable) are truncated, keeping rows and
+    the queries that read them small.
+
     Args:
         command_name (str): The name of the management command that was executed.
         success (bool, optional): Whether the command executed successfully. Defaults to True.
@@ -27,9 +129,13 @@ def record_command_execution(
         error_message (str, optional): Error message if the command failed. Defaults to "".
         duration (float, optional): Execution duration in seconds. Defaults to None.
         run_once (bool, optional): Whether this command should only run once. Defaults to False.
+        immediate (bool, optional): Whether to save the execution right away. Defaults to True.
+        fast (bool, optional): Whether to insert with a raw cursor, skipping save() and
+            model signals. Only applies when immediate=True. Defaults to False.
 
     Returns:
-        CommandExecution: The created and saved CommandExecution instance.
+        CommandExecution: The created CommandExecution instance. Buffered instances
+                          are not saved until the buffer is flushed.
 
     Example:
         >>> result = record_command_execution(
@@ -42,18 +148,230 @@ def record_command_execution(
         >>> print(result.command_name)
         migrate
     """
-    execution = CommandExecution.objects.create(
+    execution = CommandExecution(
         command_name=command_name,
         success=success,
         parameters=parameters,
-        output=output,
-        error_message=error_message,
+        output=_truncate(output),
+        error_message=_truncate(error_message),
         duration=duration,
         run_once=run_once,
     )
+
+    if immediate:
+        if fast:
+            _insert_without_signals(execution)
+        else:
+            execution.save(force_insert=True)
+        if success and run_once:
+            _remember_ran_once(command_name)
+        return execution
+
+    _write_queue.put(execution)
+    _ensure_writer()
     return execution
 
 
+def _insert_without_signals(execution):
+    """Insert an unsaved execution with a plain cursor, without calling save()."""
+    connection = connections[router.db_for_write(CommandExecution)]
+    opts = CommandExecution._meta
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+    # pre_save() fills executed_at (auto_now_add); get_db_prep_save() adapts e.g. JSON
+    values = [field.get_db_prep_save(field.pre_save(execution, add=True), connection) for field in fields]
+    quote_name = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote_name(opts.db_table),
+        ", ".join(quote_name(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
+
+
+def record_command_executions(records):
+    """
+    Record several command executions with a single bulk INSERT.
+
+    Useful for callers that run many commands and want to record all results
+    at once (e.g. a runner executing a batch of sub-commands), instead of one
+    INSERT per execution. All records are saved in one transaction.
+
+    Unlike record_command_execution(), this uses bulk_create(), so save() is
+    not called and no pre_save/post_save signals are sent.
+
+    Args:
+        records (iterable): Dictionaries of keyword arguments accepted by
+            record_command_execution(), except `immediate` and `fast`, which only
+            apply to single executions.
+
+    Returns:
+        list: The created CommandExecution instances.
+
+    Example:
+        >>> executions = record_command_executions([
+        ...     {"command_name": "sync_users", "duration": 1.2},
+        ...     {"command_name": "sync_groups", "success": False, "error_message": "Timeout"},
+        ... ])
+        >>> len(executions)
+        2
+    """
+    executions = []
+    for record in records:
+        execution = CommandExecution(**record)
+        execution.output = _truncate(execution.output)
+        execution.error_message = _truncate(execution.error_message)
+        executions.append(execution)
+    if executions:
+        _write_executions(executions)
+    return executions
+
+
+def _write_executions(items):
+    """Save a batch of buffered executions with a single bulk INSERT."""
+    with transaction.atomic():
+        CommandExecution.objects.bulk_create(items, batch_size=BATCH_SIZE)
+        for execution in items:
+            if execution.success and execution.run_once:
+                _remember_ran_once(execution.command_name)
+
+
+def _take_batch(first=None):
+    """Collect up to BATCH_SIZE queued executions without blocking."""
+    items = [] if first is None else [first]
+    while len(items) < BATCH_SIZE:
+        try:
+            item = _write_queue.get_nowait()
+        except queue.Empty:
+            break
+        if item is _STOP_WRITER:
+            # Leave the stop request for the writer thread, after this batch
+            _write_queue.put(item)
+            _write_queue.task_done()
+            break
+        items.append(item)
+    return items
+
+
+def _writer_loop():
+    """Drain the write queue in batches until the process exits."""
+    global _dropped_executions
+
+    while True:
+        first = _write_queue.get()
+        if first is _STOP_WRITER:
+            _write_queue.task_done()
+            return
+        items = _take_batch(first)
+        try:
+            _write_executions(items)
+        except Exception:
+            logger.exception("Failed to write %d buffered command executions", len(items))
+            # Reported (and reset) by the next flush_command_executions() call
+            with _WRITER_LOCK:
+                _dropped_executions += len(items)
+        finally:
+            for _ in items:
+                _write_queue.task_done()
+            close_old_connections()
+
+
+def _ensure_writer():
+    """Start the background writer thread if it is not running yet."""
+    global _writer_thread
+
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return
+    with _WRITER_LOCK:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(
+                target=_writer_loop, name="managed-commands-writer", daemon=True
+            )
+            _writer_thread.start()
+
+
+def _reset_writer_after_fork():
+    """Give a forked child its own empty queue, writer state and lock."""
+    global _write_queue, _writer_thread, _WRITER_LOCK, _dropped_executions
+
+    # The parent still owns (and writes) whatever was queued before the fork, and
+    # the copied queue mutex or writer lock may have been held by a parent thread
+    _write_queue = queue.Queue()
+    _writer_thread = None
+    _WRITER_LOCK = threading.Lock()
+    _dropped_executions = 0
+
+
+if hasattr(os, "register_at_fork"):  # pragma: no branch - not available on Windows
+    os.register_at_fork(after_in_child=_reset_writer_after_fork)
+
+
+def _stop_writer(timeout=5.0):
+    """Stop the background writer thread once it has written everything queued so far."""
+    global _writer_thread
+
+    with _WRITER_LOCK:
+        thread, _writer_thread = _writer_thread, None
+    if thread is None or not thread.is_alive():
+        return
+    _write_queue.put(_STOP_WRITER)
+    thread.join(timeout)
+
+
+def flush_command_executions(timeout=5.0):
+    """
+    Write all buffered command executions to the database.
+
+    Executions recorded with immediate=False are normally written in batches by
+    a background thread. This writes whatever is still queued from the calling
+    thread, then waits up to `timeout` seconds for batches the background thread
+    is still writing. It is registered to run at process exit, and can be called
+    explicitly (e.g. in tests) to make buffered records visible.
+
+    Note that bulk_create() does not call save() or send pre_save/post_save signals.
+
+    Batches the background thread fails to write are logged and discarded, not
+    retried; they make this function return False. Batches written from the
+    calling thread raise instead.
+
+    Args:
+        timeout (float, optional): Seconds to wait for in-flight batches. Defaults to 5.0.
+
+    Returns:
+        bool: True if every buffered execution has been written. False if the
+              timeout expired, or if the background thread dropped executions
+              since the previous flush.
+    """
+    global _dropped_executions
+
+    while True:
+        items = _take_batch()
+        if not items:
+            break
+        try:
+            _write_executions(items)
+        finally:
+            for _ in items:
+                _write_queue.task_done()
+
+    deadline = time.monotonic() + timeout
+    with _write_queue.all_tasks_done:
+        while _write_queue.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _write_queue.all_tasks_done.wait(remaining)
+
+    with _WRITER_LOCK:
+        dropped, _dropped_executions = _dropped_executions, 0
+    return not dropped
+
+
+# Registered at import rather than in AppConfig.ready(), which may run more than
+# once, so buffered executions are flushed a single time when the process exits
+atexit.register(flush_command_executions)
+
+
 def should_run_command(command_name):
     """
     Check if a command should be executed based on its execution history.
@@ -67,42 +385,46 @@ def should_run_command(command_name):
 
     Returns:
         bool: True if the command should run, False if it should be skipped.
-              Returns False only if the most recent execution was successful
-              and had run_once=True. Returns True in all other cases:
+              Returns False only if a successful execution with run_once=True
+              exists. Returns True in all other cases:
               - No previous execution exists
-              - Previous execution failed (success=False)
-              - Previous execution had run_once=False
+              - Previous executions failed (success=False)
+              - Previous executions had run_once=False
+
+    Once a committed successful run_once execution has been seen, the result is
+    cached and the database is no longer queried. Deleting the command's
+    executions or flushing the database drops the cached result; use
+    clear_should_run_cache() after deletes that send no signals (e.g. raw SQL).
 
     Example:
         >>> # First time running a command
         >>> should_run_command("setup_initial_data")
         True
+        >>> # After failed run_once execution
+        >>> record_command_execution("setup_initial_data", success=False, run_once=True)
+        >>> should_run_command("setup_initial_data")
+        True
         >>> # After successful run_once execution
         >>> record_command_execution("setup_initial_data", success=True, run_once=True)
         >>> should_run_command("setup_initial_data")
         False
-        >>> # After failed run_once execution
+        >>> # Later executions, even failed ones, do not re-enable the command
         >>> record_command_execution("setup_initial_data", success=False, run_once=True)
         >>> should_run_command("setup_initial_data")
-        True
+        False
     """
-    most_recent = (
-        CommandExecution.objects.filter(command_name=command_name)
-        .order_by("-executed_at")
-        .first()
-    )
-
-    if most_recent is None:
-        return True
+    if _should_run_cache.get(command_name) is False:
+        return False
 
-    # Only skip if the most recent execution was successful AND run_once=True
-    if most_recent.run_once and most_recent.success:
+    # Only skip if a successful run_once execution exists
+    if CommandExecution.objects.filter(command_name=command_name, run_once=True, success=True).exists():
+        _remember_ran_once(command_name)
         return False
 
     return True
 
 
-def get_command_history(command_name, limit=10):
+def get_command_history(command_name, limit=10, fields=None):
     """
     Retrieve the execution history for a specific command.
 
@@ -113,6 +435,9 @@ def get_command_history(command_name, limit=10):
     Args:
         command_name (str): The name of the management command to retrieve history for.
         limit (int, optional): Maximum number of records to return. Defaults to 10.
+        fields (iterable, optional): Field names to load. Other columns (e.g. the
+            potentially large output, error_message and parameters) are deferred
+            and only fetched if accessed. Defaults to None, which loads all fields.
 
     Returns:
         QuerySet: A Django QuerySet of CommandExecution instances, ordered by
@@ -131,9 +456,11 @@ def get_command_history(command_name, limit=10):
         >>> recent = get_command_history("collectstatic")
         >>> print(recent.count())
         10
+
+        >>> # Only load what a dashboard needs
+        >>> summary = get_command_history("migrate", fields=["executed_at", "success", "duration"])
     """
-    return (
-        CommandExecution.objects.filter(command_name=command_name)
-        .order_by("-executed_at")
-        .all()[:limit]
-    )
+    queryset = CommandExecution.objects.filter(command_name=command_name).order_by("-executed_at")
+    if fields:
+        queryset = queryset.only(*fields)
+    return queryset[:limit]
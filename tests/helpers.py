@@ -0,0 +1,11 @@
+"""
+Helpers shared by the django-managed-commands test modules.
+"""
+
+from django_managed_commands.models import CommandExecution
+
+
+def wipe_executions():
+    """Delete all CommandExecution rows in a single DELETE, skipping collection and signals."""
+    # Safe because nothing relates to CommandExecution, so there is nothing to cascade
+    CommandExecution.objects.all()._raw_delete(CommandExecution.objects.db)
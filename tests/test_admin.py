@@ -0,0 +1,47 @@
+"""
+Tests for the CommandExecution admin changelist.
+"""
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+
+from django_managed_commands.admin import CommandExecutionAdmin
+from django_managed_commands.models import CommandExecution
+
+
+class CommandExecutionChangeListTest(TestCase):
+    """Tests for the deferred-column changelist queryset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "password")
+        CommandExecution.objects.create(command_name="listed_command", output="x" * 100)
+
+    def _changelist(self, model_admin):
+        request = RequestFactory().get("/admin/django_managed_commands/commandexecution/")
+        request.user = self.user
+        return model_admin.get_changelist_instance(request)
+
+    def test_changelist_defers_unlisted_columns(self):
+        """Columns outside list_display are not loaded for listed rows."""
+        changelist = self._changelist(CommandExecutionAdmin(CommandExecution, AdminSite()))
+
+        execution = changelist.result_list[0]
+        self.assertEqual(execution.command_name, "listed_command")
+        self.assertIn("output", execution.get_deferred_fields())
+
+    def test_changelist_ignores_non_field_list_display_entries(self):
+        """Admin methods in list_display do not break the only() call."""
+
+        class MethodColumnAdmin(CommandExecutionAdmin):
+            list_display = ["command_name", "output_length", "__str__"]
+
+            def output_length(self, obj):
+                return len(obj.output)
+
+        changelist = self._changelist(MethodColumnAdmin(CommandExecution, AdminSite()))
+
+        executions = list(changelist.result_list)
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(MethodColumnAdmin.output_length(None, executions[0]), 100)
@@ -6,114 +6,171 @@ import os
 import shutil
 import sys
 import tempfile
-from io import StringIO
+from contextlib import contextmanager
+from pathlib import Path
 
 from django.core.management import call_command
-from django.core.management.base import CommandError
-from django.test import TestCase, override_settings
+from django.core.management.base import CommandError, OutputWrapper
+from django.test import SimpleTestCase, override_settings
 
-TEST_APP_NAME = "testapp"
-
-
-class CreateManagedCommandTest(TestCase):
-    """Test suite for create_managed_command management command."""
-
-    def setUp(self):
-        """Set up temporary test app directory for each test."""
-        # Create a temporary directory for test apps
-        self.test_dir = tempfile.mkdtemp()
-        self.test_app_name = TEST_APP_NAME
-        self.test_app_path = os.path.join(self.test_dir, self.test_app_name)
-
-        # Create test app directory structure
-        os.makedirs(self.test_app_path, exist_ok=True)
-
-        # Create __init__.py to make it a valid Python package
-        with open(os.path.join(self.test_app_path, "__init__.py"), "w") as f:
-            f.write("")
-
-        # Create tests directory
-        self.test_tests_dir = os.path.join(self.test_app_path, "tests")
-        os.makedirs(self.test_tests_dir, exist_ok=True)
-        with open(os.path.join(self.test_tests_dir, "__init__.py"), "w") as f:
-            f.write("")
-
-        # Add test_dir to sys.path so testapp can be imported
-        sys.path.insert(0, self.test_dir)
+from django_managed_commands.management.commands.create_managed_command import Command as CreateManagedCommand
 
-    def tearDown(self):
-        """Clean up temporary test app directory after each test."""
-        # Remove test_dir from sys.path
-        if self.test_dir in sys.path:
-            sys.path.remove(self.test_dir)
-
-        # Remove testapp from sys.modules to force reimport
-        modules_to_remove = [key for key in sys.modules.keys() if key.startswith(TEST_APP_NAME)]
-        for module in modules_to_remove:
-            del sys.modules[module]
-
-        if os.path.exists(self.test_dir):
-            shutil.rmtree(self.test_dir)
-
-    def _get_command_path(self, command_name):
-        """Helper to get expected command file path."""
-        return os.path.join(self.test_app_path, "management", "commands", f"{command_name}.py")
-
-    def _get_test_path(self, command_name):
-        """Helper to get expected test file path."""
-        return os.path.join(self.test_tests_dir, f"test_{command_name}.py")
+TEST_APP_NAME = "testapp"
+COMMAND_NAME = "mycommand"
+
+INVALID_COMMAND_NAMES = (
+    "my-command",  # hyphens not allowed
+    "my command",  # spaces not allowed
+    "123command",  # can't start with number
+    "my.command",  # dots not allowed
+)
+
+# (substring, failure message) pairs expected in the generated command file
+_EXPECTED_COMMAND_SUBSTRINGS = (
+    ("from django_managed_commands.base import ManagedCommand", "Command should import ManagedCommand"),
+    ("class Command(ManagedCommand):", "Command class should extend ManagedCommand"),
+    ("def execute_command(self", "Command should have execute_command method"),
+    ("help = ", "Command should have help attribute"),
+    (COMMAND_NAME, "Generated command should reference its command name"),
+)
+
+# (substring, failure message) pairs expected in the generated test file
+_EXPECTED_TEST_SUBSTRINGS = (
+    ("from django.test import TestCase", "Test should import TestCase"),
+    ("from django.core.management import call_command", "Test should import call_command"),
+    (
+        "from django_managed_commands.models import CommandExecution",
+        "Test should import CommandExecution model",
+    ),
+    ("class TestMycommandCommand(TestCase):", "Generated test should contain a Test class extending TestCase"),
+)
+
+
+@contextmanager
+def _chdir(path):
+    """Temporarily change the working directory (contextlib.chdir is Python 3.11+)."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _generate(app_name, command_name, stdout, cwd, run_once=False, force=False):
+    """
+    Run create_managed_command's handle() directly, bypassing argparse dispatch.
+
+    Generation runs from cwd so that any path wrongly resolved against the
+    working directory lands in the temporary directory, not the repository.
+    """
+    command = CreateManagedCommand()
+    command.stdout = OutputWrapper(stdout)
+    command.stderr = OutputWrapper(stdout)
+    with _chdir(cwd):
+        command.handle(app_name=[app_name], command_name=[command_name], run_once=run_once, force=force)
+
+
+def _read(path):
+    """Return the text content of a generated file."""
+    return Path(path).read_text()
+
+
+class TemporaryAppMixin:
+    """
+    Build a throwaway testapp package shared by every test in a class.
+
+    The skeleton is created once in setUpClass and removed in tearDownClass.
+    Combine with a class-level INSTALLED_APPS override naming TEST_APP_NAME.
+    """
+
+    command_name = COMMAND_NAME
+
+    @classmethod
+    def setUpClass(cls):
+        """Create the temporary test app and register it with the app registry."""
+        # The app must be importable before super() applies the INSTALLED_APPS override
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.test_dir = cls._tmp.name
+        cls.test_app_name = TEST_APP_NAME
+        cls.test_app_path = os.path.join(cls.test_dir, cls.test_app_name)
+
+        # Create test app directory structure (tests/ implies the app directory)
+        cls.test_tests_dir = os.path.join(cls.test_app_path, "tests")
+        os.makedirs(cls.test_tests_dir, exist_ok=True)
+
+        # Create __init__.py files to make both valid Python packages
+        Path(cls.test_app_path, "__init__.py").touch()
+        Path(cls.test_tests_dir, "__init__.py").touch()
+
+        # testapp only needs to be importable while the override populates the
+        # app registry; the tests read generated files and never import them
+        cls._modules_before = frozenset(sys.modules)
+        sys.path.insert(0, cls.test_dir)
+        try:
+            super().setUpClass()
+        finally:
+            # Inserted at index 0 above, so no need to scan the whole list
+            if sys.path and sys.path[0] == cls.test_dir:
+                del sys.path[0]
+            else:
+                sys.path.remove(cls.test_dir)
+
+        cls.command_path = os.path.join(cls.test_app_path, "management", "commands", f"{cls.command_name}.py")
+        cls.test_path = os.path.join(cls.test_tests_dir, f"test_{cls.command_name}.py")
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the temporary test app directory."""
+        super().tearDownClass()
+
+        # Remove testapp modules imported by the app registry to force reimport
+        for module in sys.modules.keys() - cls._modules_before:
+            if module.startswith(TEST_APP_NAME):
+                del sys.modules[module]
+
+        cls._tmp.cleanup()
+
+
+@override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
+class CreateManagedCommandGenerationTest(TemporaryAppMixin, SimpleTestCase):
+    """
+    Read-only assertions on the files generated by create_managed_command.
+
+    The default command and a --run-once variant are generated once for the
+    whole class, and each test only inspects the cached file contents.
+    """
+
+    run_once_command_name = f"{COMMAND_NAME}_once"
+
+    @classmethod
+    def setUpClass(cls):
+        """Generate the commands into the shared test app once."""
+        super().setUpClass()
+        with open(os.devnull, "w") as null:
+            _generate(cls.test_app_name, cls.command_name, null, cls.test_dir)
+            _generate(cls.test_app_name, cls.run_once_command_name, null, cls.test_dir, run_once=True)
+
+        cls._command_content = _read(cls.command_path)
+        cls._test_content = _read(cls.test_path)
+        cls._run_once_content = _read(
+            os.path.join(cls.test_app_path, "management", "commands", f"{cls.run_once_command_name}.py")
+        )
 
     # ============================================
     # Basic Generation Tests
     # ============================================
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_creates_command_file(self):
         """Verify command file is created in correct location."""
-        command_name = "mycommand"
-
-        # Call the command
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
-
-        # Verify command file exists
-        command_path = self._get_command_path(command_name)
-        self.assertTrue(os.path.exists(command_path), f"Command file should exist at {command_path}")
+        self.assertTrue(os.path.exists(self.command_path), f"Command file should exist at {self.command_path}")
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_creates_test_file(self):
         """Verify test file is created."""
-        command_name = "mycommand"
-
-        # Call the command
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
-
-        # Verify test file exists
-        test_path = self._get_test_path(command_name)
-        self.assertTrue(os.path.exists(test_path), f"Test file should exist at {test_path}")
+        self.assertTrue(os.path.exists(self.test_path), f"Test file should exist at {self.test_path}")
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_creates_init_files(self):
         """Verify __init__.py files are created in management/commands/."""
-        command_name = "mycommand"
-
-        # Call the command
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
-
         # Verify __init__.py in management/
         management_init = os.path.join(self.test_app_path, "management", "__init__.py")
         self.assertTrue(
@@ -128,89 +185,61 @@ class CreateManagedCommandTest(TestCase):
             f"__init__.py should exist at {commands_init}",
         )
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_command_file_has_managed_command(self):
-        """Verify generated command imports and extends ManagedCommand."""
-        command_name = "mycommand"
+    # ============================================
+    # File Content Tests
+    # ============================================
 
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
+    def test_generated_command_contents(self):
+        """Verify generated command extends ManagedCommand and defines its hooks."""
+        for needle, msg in _EXPECTED_COMMAND_SUBSTRINGS:
+            with self.subTest(needle=needle):
+                self.assertIn(needle, self._command_content, msg)
 
-        command_path = self._get_command_path(command_name)
-        with open(command_path, "r") as f:
-            content = f.read()
+    def test_generated_test_contents(self):
+        """Verify generated test imports its dependencies and names its TestCase."""
+        for needle, msg in _EXPECTED_TEST_SUBSTRINGS:
+            with self.subTest(needle=needle):
+                self.assertIn(needle, self._test_content, msg)
 
-        self.assertIn(
-            "from django_managed_commands.base import ManagedCommand",
-            content,
-            "Command should import ManagedCommand",
-        )
+    # ============================================
+    # Options Tests
+    # ============================================
 
+    def test_run_once_flag(self):
+        """Test --run-once flag generates run_once=True."""
         self.assertIn(
-            "class Command(ManagedCommand):",
-            content,
-            "Command class should extend ManagedCommand",
+            "run_once = True",
+            self._run_once_content,
+            "Command should have run_once = True when --run-once flag is used",
         )
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_command_file_uses_managed_command_base(self):
-        """Verify generated file extends ManagedCommand which provides tracking."""
-        command_name = "mycommand"
 
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
+@override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
+class CreateManagedCommandTest(TemporaryAppMixin, SimpleTestCase):
+    """
+    Tests for create_managed_command validation and overwriting.
 
-        command_path = self._get_command_path(command_name)
-        with open(command_path, "r") as f:
-            content = f.read()
+    The temporary app is shared by the class; each test starts from the bare
+    app skeleton because tearDown removes whatever the command generated.
+    """
 
-        self.assertIn(
-            "from django_managed_commands.base import ManagedCommand",
-            content,
-            "Command should import ManagedCommand which provides tracking",
-        )
+    @classmethod
+    def setUpClass(cls):
+        """Open a shared sink for command output."""
+        super().setUpClass()
+        cls._null = open(os.devnull, "w")
 
-        self.assertIn(
-            "class Command(ManagedCommand):",
-            content,
-            "Command should extend ManagedCommand for automatic tracking",
-        )
-
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_test_file_has_testcase(self):
-        """Verify generated test imports TestCase."""
-        command_name = "mycommand"
-
-        # Call the command
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
-
-        # Read generated test file
-        test_path = self._get_test_path(command_name)
-        with open(test_path, "r") as f:
-            content = f.read()
+    @classmethod
+    def tearDownClass(cls):
+        """Close the shared output sink."""
+        cls._null.close()
+        super().tearDownClass()
 
-        # Verify imports TestCase
-        self.assertIn("from django.test import TestCase", content, "Test should import TestCase")
-
-        # Verify imports call_command
-        self.assertIn(
-            "from django.core.management import call_command",
-            content,
-            "Test should import call_command",
-        )
+    def tearDown(self):
+        """Remove files generated by the test, leaving the app skeleton."""
+        shutil.rmtree(os.path.join(self.test_app_path, "management"), ignore_errors=True)
+        for generated_test in Path(self.test_tests_dir).glob("test_*.py"):
+            generated_test.unlink()
 
     # ============================================
     # Validation Tests
@@ -220,7 +249,7 @@ class CreateManagedCommandTest(TestCase):
         """Test missing arguments raise error."""
         # Test missing both arguments
         with self.assertRaises(CommandError) as cm:
-            call_command("create_managed_command", stdout=StringIO())
+            call_command("create_managed_command", stdout=self._null)
 
         # The error message should indicate missing arguments
         error_msg = str(cm.exception).lower()
@@ -231,11 +260,10 @@ class CreateManagedCommandTest(TestCase):
 
     def test_validates_app_exists_in_installed_apps(self):
         """Test invalid app raises CommandError."""
-        command_name = "mycommand"
         invalid_app = "nonexistent_app"
 
         with self.assertRaises(CommandError) as cm:
-            call_command("create_managed_command", invalid_app, command_name, stdout=StringIO())
+            _generate(invalid_app, self.command_name, self._null, self.test_dir)
 
         # Error should mention the app not being in INSTALLED_APPS
         error_msg = str(cm.exception).lower()
@@ -244,25 +272,14 @@ class CreateManagedCommandTest(TestCase):
             f"Error should mention INSTALLED_APPS: {error_msg}",
         )
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_validates_command_name_is_valid_identifier(self):
         """Test invalid command names raise error."""
-        invalid_names = [
-            "my-command",  # hyphens not allowed
-            "my command",  # spaces not allowed
-            "123command",  # can't start with number
-            "my.command",  # dots not allowed
-        ]
-
-        for invalid_name in invalid_names:
+        # Validation runs before any file I/O, so check each name against the validator directly
+        command = CreateManagedCommand()
+        for invalid_name in INVALID_COMMAND_NAMES:
             with self.subTest(command_name=invalid_name):
                 with self.assertRaises(CommandError) as cm:
-                    call_command(
-                        "create_managed_command",
-                        self.test_app_name,
-                        invalid_name,
-                        stdout=StringIO(),
-                    )
+                    command.validate_command_name(invalid_name)
 
                 # Error should mention invalid identifier
                 error_msg = str(cm.exception).lower()
@@ -271,94 +288,26 @@ class CreateManagedCommandTest(TestCase):
                     f"Error should mention invalid identifier for '{invalid_name}': {error_msg}",
                 )
 
-    # ============================================
-    # Options Tests
-    # ============================================
-
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_run_once_flag(self):
-        """Test --run-once flag generates run_once=True."""
-        command_name = "mycommand"
-
-        # Call the command with --run-once flag
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            run_once=True,
-            stdout=StringIO(),
-        )
-
-        # Read generated command file
-        command_path = self._get_command_path(command_name)
-        with open(command_path, "r") as f:
-            content = f.read()
-
-        # Verify run_once is set to True
-        self.assertIn(
-            "run_once = True",
-            content,
-            "Command should have run_once = True when --run-once flag is used",
-        )
-
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_force_flag_overwrites_existing(self):
-        """Test --force flag allows overwriting existing files."""
-        command_name = "mycommand"
-
-        # Create command first time
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
-
-        # Modify the generated file
-        command_path = self._get_command_path(command_name)
-        with open(command_path, "a") as f:
-            f.write("\n# MODIFIED\n")
-
-        # Verify modification exists
-        with open(command_path, "r") as f:
-            content_before = f.read()
-        self.assertIn("# MODIFIED", content_before)
-
-        # Create command again with --force
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            force=True,
-            stdout=StringIO(),
-        )
-
-        # Verify file was overwritten (modification gone)
-        with open(command_path, "r") as f:
-            content_after = f.read()
-        self.assertNotIn(
-            "# MODIFIED",
-            content_after,
-            "File should be overwritten when --force is used",
+        # handle() must run the same validation before writing anything
+        with self.assertRaises(CommandError):
+            _generate(self.test_app_name, INVALID_COMMAND_NAMES[0], self._null, self.test_dir)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.test_app_path, "management")),
+            "No files should be generated for an invalid command name",
         )
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_without_force_warns_on_existing(self):
-        """Test warns without --force when file exists."""
-        command_name = "mycommand"
+    # ============================================
+    # Overwrite Tests
+    # ============================================
 
+    def test_existing_file_semantics(self):
+        """Test existing files are kept without --force and overwritten with it."""
         # Create command first time
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
+        _generate(self.test_app_name, self.command_name, self._null, self.test_dir)
 
         # Try to create again without --force
-        out = StringIO()
         with self.assertRaises(CommandError) as cm:
-            call_command("create_managed_command", self.test_app_name, command_name, stdout=out)
+            _generate(self.test_app_name, self.command_name, self._null, self.test_dir)
 
         # Error should mention file exists or use --force
         error_msg = str(cm.exception).lower()
@@ -367,144 +316,18 @@ class CreateManagedCommandTest(TestCase):
             f"Error should mention file exists or --force flag: {error_msg}",
         )
 
-    # ============================================
-    # File Content Tests
-    # ============================================
-
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_generated_command_has_correct_class_name(self):
-        """Verify Command class exists in generated file."""
-        command_name = "mycommand"
-
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
-
-        command_path = self._get_command_path(command_name)
-        with open(command_path, "r") as f:
-            content = f.read()
-
-        self.assertIn(
-            "class Command(ManagedCommand):",
-            content,
-            "Generated file should contain Command class extending ManagedCommand",
-        )
-
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_generated_test_has_correct_class_name(self):
-        """Verify test class is named correctly."""
-        command_name = "mycommand"
-
-        # Call the command
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
-
-        # Read generated test file
-        test_path = self._get_test_path(command_name)
-        with open(test_path, "r") as f:
-            content = f.read()
-
-        # Verify test class exists with correct naming pattern
-        # Should be something like TestMycommandCommand or TestMyCommand
-        self.assertTrue(
-            "class Test" in content and "Command(TestCase):" in content,
-            "Generated test should contain a Test class extending TestCase",
-        )
-
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_generated_command_has_execute_command_method(self):
-        """Verify generated command has execute_command method."""
-        command_name = "mycommand"
-
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
-
-        command_path = self._get_command_path(command_name)
-        with open(command_path, "r") as f:
-            content = f.read()
-
-        self.assertIn("def execute_command(self", content, "Command should have execute_command method")
-
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_generated_command_has_help_text(self):
-        """Verify generated command has help attribute."""
-        command_name = "mycommand"
-
-        # Call the command
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
-
-        # Read generated command file
-        command_path = self._get_command_path(command_name)
-        with open(command_path, "r") as f:
-            content = f.read()
-
-        # Verify help attribute exists
-        self.assertIn("help = ", content, "Command should have help attribute")
-
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_generated_command_includes_app_and_command_name(self):
-        """Verify generated command includes app and command name in content."""
-        command_name = "mycommand"
-
-        # Call the command
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
-
-        # Read generated command file
-        command_path = self._get_command_path(command_name)
-        with open(command_path, "r") as f:
-            content = f.read()
-
-        # Verify app name and command name appear in the file
-        # (likely in command_name variable or comments)
-        self.assertTrue(
-            self.test_app_name in content or command_name in content,
-            "Generated command should reference app or command name",
-        )
-
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
-    def test_generated_test_imports_command_execution_model(self):
-        """Verify generated test imports CommandExecution model."""
-        command_name = "mycommand"
-
-        # Call the command
-        call_command(
-            "create_managed_command",
-            self.test_app_name,
-            command_name,
-            stdout=StringIO(),
-        )
+        # Modify the generated file
+        with open(self.command_path, "a") as f:
+            f.write("\n# MODIFIED\n")
 
-        # Read generated test file
-        test_path = self._get_test_path(command_name)
-        with open(test_path, "r") as f:
-            content = f.read()
+        # Create command again with --force
+        _generate(self.test_app_name, self.command_name, self._null, self.test_dir, force=True)
 
-        # Verify imports CommandExecution
-        self.assertIn(
-            "from django_managed_commands.models import CommandExecution",
-            content,
-            "Test should import CommandExecution model",
+        # Verify file was overwritten (modification gone)
+        self.assertNotIn(
+            "# MODIFIED",
+            _read(self.command_path),
+            "File should be overwritten when --force is used",
         )
 
     # TODO: Generation of command with flags
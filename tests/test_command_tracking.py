@@ -3,63 +3,99 @@ End-to-end integration tests for command tracking workflow.
 
 This test suite verifies the complete workflow: generate command → run command → verify tracking works.
 Tests ensure that generated commands properly integrate with the CommandExecution tracking system.
+ManagedCommand behaviour that needs no generated app is covered by the unit tests at the end.
 """
 
-import importlib
+import functools
+import importlib.util
 import os
-import shutil
 import sys
 import tempfile
+import types
 from io import StringIO
+from pathlib import Path
+from unittest import mock
 
 from django.core.management import call_command
-from django.test import TestCase, override_settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
 
+from django_managed_commands import utils
+from django_managed_commands.base import ManagedCommand
+from django_managed_commands.management.commands.create_managed_command import render_command
 from django_managed_commands.models import CommandExecution
+from tests.helpers import wipe_executions
 
 TEST_APP_NAME = "testapp"
 
 
+class _NullIO:
+    """Write-only stream that discards everything, for command output no test reads."""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+_STDOUT_NULL = _NullIO()
+
+
+@functools.lru_cache(maxsize=None)
+def _full_name(app_name, command_name):
+    """Return the name a generated command is recorded under."""
+    return f"{app_name}.{command_name}"
+
+
+@override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
 class CommandTrackingIntegrationTest(TestCase):
     """Integration tests for command generation and execution tracking."""
 
-    def setUp(self):
-        """Set up temporary test app and generate a test command."""
+    @classmethod
+    def setUpClass(cls):
+        """Set up a temporary test app shared by every test in the class."""
         # Create a temporary directory for test apps
-        self.test_dir = tempfile.mkdtemp()
-        self.test_app_name = TEST_APP_NAME
-        self.test_app_path = os.path.join(self.test_dir, self.test_app_name)
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.test_dir = cls._tmp.name
+        cls.test_app_name = TEST_APP_NAME
+        cls.test_app_path = os.path.join(cls.test_dir, cls.test_app_name)
 
         # Create test app directory structure
-        os.makedirs(self.test_app_path, exist_ok=True)
+        os.makedirs(cls.test_app_path, exist_ok=True)
 
         # Create __init__.py to make it a valid Python package
-        with open(os.path.join(self.test_app_path, "__init__.py"), "w") as f:
+        with open(os.path.join(cls.test_app_path, "__init__.py"), "w") as f:
             f.write("")
 
-        # Add test_dir to sys.path so testapp can be imported
-        sys.path.insert(0, self.test_dir)
+        # Add test_dir to sys.path so testapp can be imported; this must happen
+        # before super() applies the class-level INSTALLED_APPS override
+        sys.path.insert(0, cls.test_dir)
 
-        # Clear any existing CommandExecution records
-        CommandExecution.objects.all().delete()
+        # Generated commands are written here by create_managed_command
+        cls.commands_dir = os.path.join(cls.test_app_path, "management", "commands")
 
-    def tearDown(self):
-        """Clean up temporary test app directory and CommandExecution records."""
-        # Remove test_dir from sys.path
-        if self.test_dir in sys.path:
-            sys.path.remove(self.test_dir)
+        super().setUpClass()
 
-        # Remove testapp from sys.modules to force reimport
-        modules_to_remove = [key for key in sys.modules.keys() if key.startswith(TEST_APP_NAME)]
-        for module in modules_to_remove:
-            del sys.modules[module]
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up the temporary test app directory."""
+        super().tearDownClass()
+
+        # Remove test_dir from sys.path
+        if cls.test_dir in sys.path:
+            sys.path.remove(cls.test_dir)
 
         # Clean up temporary directory
-        if os.path.exists(self.test_dir):
-            shutil.rmtree(self.test_dir)
+        cls._tmp.cleanup()
+
+        # Remove testapp from sys.modules to force reimport
+        for key in [key for key in sys.modules if key.startswith(TEST_APP_NAME)]:
+            del sys.modules[key]
 
-        # Clean up CommandExecution records
-        CommandExecution.objects.all().delete()
+    def setUp(self):
+        """Clear any existing CommandExecution records."""
+        wipe_executions()
 
     def _generate_command(self, command_name, run_once=False):
         """Helper to generate a test command."""
@@ -68,37 +104,42 @@ class CommandTrackingIntegrationTest(TestCase):
             self.test_app_name,
             command_name,
             run_once=run_once,
-            stdout=StringIO(),
+            stdout=_STDOUT_NULL,
         )
 
     def _get_command_path(self, command_name):
         """Helper to get command file path."""
-        return os.path.join(self.test_app_path, "management", "commands", f"{command_name}.py")
+        return os.path.join(self.commands_dir, f"{command_name}.py")
 
     def _load_command_class(self, command_name):
         """Helper to dynamically load a generated command class."""
-        # Import the command module
         module_path = f"{self.test_app_name}.management.commands.{command_name}"
+        file_path = self._get_command_path(command_name)
 
-        # Remove from sys.modules if already loaded to force fresh import
-        if module_path in sys.modules:
-            del sys.modules[module_path]
-
-        # Import the module
-        module = importlib.import_module(module_path)
+        # Load straight from the known file, skipping the sys.path finder walk
+        spec = importlib.util.spec_from_file_location(module_path, file_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_path] = module
+        spec.loader.exec_module(module)
 
         # Return the Command class
         return module.Command()
 
+    def _make_command_in_memory(self, command_name, run_once=False):
+        """Helper to build a generated command from its rendered source without touching disk."""
+        module = types.ModuleType(f"{self.test_app_name}.management.commands.{command_name}")
+        source = render_command(self.test_app_name, command_name, run_once)
+        exec(compile(source, f"<{command_name}>", "exec"), module.__dict__)
+        return module.Command()
+
     # ============================================
     # Integration Tests
     # ============================================
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_generated_command_records_execution(self):
         """Verify generated command creates CommandExecution record when run."""
         command_name = "test_tracking_command"
-        full_command_name = f"{self.test_app_name}.{command_name}"
+        full_command_name = _full_name(self.test_app_name, command_name)
 
         # Generate the command
         self._generate_command(command_name)
@@ -112,7 +153,7 @@ class CommandTrackingIntegrationTest(TestCase):
 
         # Load and run the generated command
         command = self._load_command_class(command_name)
-        call_command(command, stdout=StringIO())
+        call_command(command, stdout=_STDOUT_NULL)
 
         # Verify execution was recorded
         executions = CommandExecution.objects.filter(command_name=full_command_name)
@@ -130,57 +171,43 @@ class CommandTrackingIntegrationTest(TestCase):
             "Recorded execution should have correct command name",
         )
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_generated_command_records_success(self):
         """Verify generated command records success=True for successful execution."""
         command_name = "test_success_command"
-        full_command_name = f"{self.test_app_name}.{command_name}"
+        full_command_name = _full_name(self.test_app_name, command_name)
 
-        # Generate and run the command
-        self._generate_command(command_name)
-        command = self._load_command_class(command_name)
-        call_command(command, stdout=StringIO())
+        # Render the command in memory and run it
+        command = self._make_command_in_memory(command_name)
+        call_command(command, stdout=_STDOUT_NULL)
 
         # Verify success is True
         execution = CommandExecution.objects.get(command_name=full_command_name)
         self.assertTrue(execution.success, "Successful command execution should have success=True")
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_generated_command_records_parameters(self):
         """Verify generated command records parameters when command has arguments."""
         command_name = "test_params_command"
 
-        # Generate the command
-        self._generate_command(command_name)
-
-        # Modify the generated command to accept arguments
-        command_path = self._get_command_path(command_name)
-        with open(command_path, "r") as f:
-            content = f.read()
-
-        exec_cmd_start = content.find("def execute_command(self")
-        if exec_cmd_start != -1:
-            new_add_arguments = """def add_arguments(self, parser):
-        super().add_arguments(parser)
-        parser.add_argument(
-            '--test-arg',
-            type=str,
-            default='default_value',
-            help='Test argument for parameter tracking'
-        )
-
-    """
-            content = content[:exec_cmd_start] + new_add_arguments + content[exec_cmd_start:]
+        # Render the command and extend its parser in memory to accept an argument
+        command = self._make_command_in_memory(command_name)
+        original_add_arguments = command.add_arguments
+
+        def add_arguments(parser):
+            original_add_arguments(parser)
+            parser.add_argument(
+                "--test-arg",
+                type=str,
+                default="default_value",
+                help="Test argument for parameter tracking",
+            )
 
-            with open(command_path, "w") as f:
-                f.write(content)
+        command.add_arguments = add_arguments
 
-        # Load and run the command with a parameter
-        command = self._load_command_class(command_name)
-        call_command(command, test_arg="test_value", stdout=StringIO())
+        # Run the command with a parameter
+        call_command(command, test_arg="test_value", stdout=_STDOUT_NULL)
 
         # Verify parameters were recorded
-        full_command_name = f"{self.test_app_name}.{command_name}"
+        full_command_name = _full_name(self.test_app_name, command_name)
         execution = CommandExecution.objects.get(command_name=full_command_name)
         self.assertIsNotNone(execution.parameters, "Command execution should record parameters")
         self.assertIn("test_arg", execution.parameters, "Parameters should include test_arg")
@@ -190,36 +217,30 @@ class CommandTrackingIntegrationTest(TestCase):
             "Parameter value should be recorded correctly",
         )
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_generated_command_records_duration(self):
         """Verify generated command records execution duration."""
         command_name = "test_duration_command"
-        full_command_name = f"{self.test_app_name}.{command_name}"
+        full_command_name = _full_name(self.test_app_name, command_name)
 
-        # Generate and run the command
-        self._generate_command(command_name)
-        command = self._load_command_class(command_name)
-        call_command(command, stdout=StringIO())
+        # Render the command in memory and run it
+        command = self._make_command_in_memory(command_name)
+        call_command(command, stdout=_STDOUT_NULL)
 
         # Verify duration is set
         execution = CommandExecution.objects.get(command_name=full_command_name)
         self.assertIsNotNone(execution.duration, "Command execution should record duration")
         self.assertGreaterEqual(execution.duration, 0, "Duration should be non-negative")
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_run_once_command_prevents_second_run(self):
         """Verify command generated with --run-once prevents re-execution."""
         command_name = "test_run_once_command"
-        full_command_name = f"{self.test_app_name}.{command_name}"
-
-        # Generate command with run_once=True
-        self._generate_command(command_name, run_once=True)
+        full_command_name = _full_name(self.test_app_name, command_name)
 
-        # Load the command
-        command = self._load_command_class(command_name)
+        # Render the command with run_once=True
+        command = self._make_command_in_memory(command_name, run_once=True)
 
         # Run the command first time
-        call_command(command, stdout=StringIO())
+        call_command(command, stdout=_STDOUT_NULL)
 
         # Verify first execution was recorded
         first_execution = CommandExecution.objects.get(command_name=full_command_name)
@@ -242,33 +263,18 @@ class CommandTrackingIntegrationTest(TestCase):
             "Only one execution should be recorded for run_once command",
         )
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_failed_command_records_error(self):
         """Verify failed command execution records error information."""
         command_name = "test_error_command"
-        full_command_name = f"{self.test_app_name}.{command_name}"
-
-        # Generate the command
-        self._generate_command(command_name)
+        full_command_name = _full_name(self.test_app_name, command_name)
 
-        command_path = self._get_command_path(command_name)
-        with open(command_path, "r") as f:
-            content = f.read()
+        # Render the command and make its logic fail
+        command = self._make_command_in_memory(command_name)
+        command.execute_command = mock.Mock(side_effect=ValueError("Test error for integration testing"))
 
-        logic_marker = "# TODO: Add your command logic here"
-        if logic_marker in content:
-            content = content.replace(
-                logic_marker,
-                'raise ValueError("Test error for integration testing")',
-            )
-
-            with open(command_path, "w") as f:
-                f.write(content)
-
-        # Load and run the command and expect it to fail
-        command = self._load_command_class(command_name)
+        # Run the command and expect it to fail
         try:
-            call_command(command, stdout=StringIO())
+            call_command(command, stdout=_STDOUT_NULL)
         except Exception:
             pass  # Expected to fail
 
@@ -282,42 +288,185 @@ class CommandTrackingIntegrationTest(TestCase):
             "Error message should contain the exception message",
         )
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_multiple_executions_tracked_separately(self):
         """Verify multiple executions of same command are tracked separately."""
         command_name = "test_multiple_command"
-        full_command_name = f"{self.test_app_name}.{command_name}"
-
-        # Generate the command (without run_once)
-        self._generate_command(command_name, run_once=False)
+        full_command_name = _full_name(self.test_app_name, command_name)
 
-        # Load the command
-        command = self._load_command_class(command_name)
+        # Render the command (without run_once)
+        command = self._make_command_in_memory(command_name, run_once=False)
 
         # Run the command multiple times
-        call_command(command, stdout=StringIO())
-        call_command(command, stdout=StringIO())
-        call_command(command, stdout=StringIO())
+        call_command(command, stdout=_STDOUT_NULL)
+        call_command(command, stdout=_STDOUT_NULL)
+        call_command(command, stdout=_STDOUT_NULL)
 
         # Verify all executions were recorded
-        executions = CommandExecution.objects.filter(command_name=full_command_name)
+        executions = CommandExecution.objects.filter(command_name=full_command_name).only("success")
         self.assertEqual(executions.count(), 3, "All three executions should be recorded separately")
 
         # Verify all are successful
-        for execution in executions:
+        for execution in executions.iterator(chunk_size=10):
             self.assertTrue(execution.success, "All executions should be successful")
 
-    @override_settings(INSTALLED_APPS=["django_managed_commands", TEST_APP_NAME])
     def test_generated_command_has_executed_at_timestamp(self):
         """Verify generated command records execution timestamp."""
         command_name = "test_timestamp_command"
-        full_command_name = f"{self.test_app_name}.{command_name}"
+        full_command_name = _full_name(self.test_app_name, command_name)
 
-        # Generate and run the command
-        self._generate_command(command_name)
-        command = self._load_command_class(command_name)
-        call_command(command, stdout=StringIO())
+        # Render the command in memory and run it
+        command = self._make_command_in_memory(command_name)
+        call_command(command, stdout=_STDOUT_NULL)
 
         # Verify executed_at is set
         execution = CommandExecution.objects.get(command_name=full_command_name)
         self.assertIsNotNone(execution.executed_at, "Command execution should have executed_at timestamp")
+
+
+class ManagedCommandTest(SimpleTestCase):
+    """Unit tests for ManagedCommand helpers that need no database."""
+
+    def test_command_name_is_cached_per_class(self):
+        """Verify the derived command name is cached on each class without leaking to subclasses."""
+
+        class ParentCommand(ManagedCommand):
+            pass
+
+        ParentCommand.__module__ = "parentapp.management.commands.parent_command"
+        ChildCommand = type("ChildCommand", (ParentCommand,), {"__module__": "childapp.management.commands.child"})
+
+        self.assertEqual(ParentCommand().get_command_name(), "parentapp.parent_command")
+        self.assertEqual(ParentCommand.__dict__["_cached_command_name"], "parentapp.parent_command")
+        self.assertEqual(ChildCommand().get_command_name(), "childapp.child")
+
+    def test_serializable_options_keep_argument_order(self):
+        """Verify stored options keep the order the command received them in."""
+        options = {"zeta": 1, "verbosity": 1, "alpha": 2, "stdout": None, "middle": 3}
+
+        serializable = ManagedCommand().get_serializable_options(options)
+
+        self.assertEqual(list(serializable), ["zeta", "verbosity", "alpha", "middle"])
+
+
+class ManagedCommandExecutionTest(TestCase):
+    """Tests for how ManagedCommand.handle() runs and records hand-written commands."""
+
+    def setUp(self):
+        """Clear any existing CommandExecution records."""
+        wipe_executions()
+
+    def test_non_atomic_command_skips_transaction(self):
+        """Verify atomic = False runs execute_command without opening a transaction."""
+        depths = []
+
+        class NonAtomicCommand(ManagedCommand):
+            command_name = "testapp.non_atomic_command"
+            atomic = False
+
+            def execute_command(self, *args, **options):
+                depths.append(len(connection.atomic_blocks))
+
+        outer_depth = len(connection.atomic_blocks)
+        call_command(NonAtomicCommand(), stdout=_STDOUT_NULL)
+        call_command(NonAtomicCommand(), "--dry-run", stdout=_STDOUT_NULL)
+
+        self.assertEqual(depths, [outer_depth, outer_depth + 1], "Only --dry-run should open a transaction")
+        self.assertEqual(CommandExecution.objects.filter(command_name="testapp.non_atomic_command").count(), 1)
+
+    @mock.patch.object(utils, "_ensure_writer")
+    def test_buffered_command_skips_outer_transaction(self, ensure_writer):
+        """Verify buffered commands run in a single transaction, since their record is only queued."""
+        depths = []
+
+        class DepthCommand(ManagedCommand):
+            command_name = "testapp.depth_command"
+
+            def execute_command(self, *args, **options):
+                depths.append(len(connection.atomic_blocks))
+
+        class BufferedDepthCommand(DepthCommand):
+            buffer_executions = True
+
+        outer_depth = len(connection.atomic_blocks)
+        call_command(DepthCommand(), stdout=_STDOUT_NULL)
+        call_command(BufferedDepthCommand(), stdout=_STDOUT_NULL)
+        utils.flush_command_executions()
+
+        self.assertEqual(depths, [outer_depth + 2, outer_depth + 1])
+        self.assertEqual(CommandExecution.objects.filter(command_name="testapp.depth_command").count(), 2)
+
+    @mock.patch.object(utils, "_ensure_writer")
+    def test_buffered_command_queues_failures(self, ensure_writer):
+        """Verify buffer_executions queues failed executions instead of writing them inline."""
+
+        class FailingBufferedCommand(ManagedCommand):
+            command_name = "testapp.failing_buffered_command"
+            buffer_executions = True
+
+            def execute_command(self, *args, **options):
+                raise ValueError("Buffered failure")
+
+        with self.assertRaises(ValueError):
+            call_command(FailingBufferedCommand(), stdout=_STDOUT_NULL)
+
+        self.assertFalse(CommandExecution.objects.filter(command_name="testapp.failing_buffered_command").exists())
+
+        utils.flush_command_executions()
+
+        execution = CommandExecution.objects.get(command_name="testapp.failing_buffered_command")
+        self.assertFalse(execution.success)
+        self.assertIn("Buffered failure", execution.error_message)
+
+    def test_failed_command_rolls_back_work_but_keeps_record(self):
+        """Verify a failure rolls back the command's changes while its failure record is kept."""
+
+        class PartialWorkCommand(ManagedCommand):
+            command_name = "testapp.partial_work_command"
+
+            def execute_command(self, *args, **options):
+                CommandExecution.objects.create(command_name="testapp.side_effect")
+                raise ValueError("Failed after doing some work")
+
+        with self.assertRaises(ValueError):
+            call_command(PartialWorkCommand(), stdout=_STDOUT_NULL)
+
+        self.assertFalse(CommandExecution.objects.filter(command_name="testapp.side_effect").exists())
+        execution = CommandExecution.objects.get(command_name="testapp.partial_work_command")
+        self.assertFalse(execution.success)
+
+    def test_unstorable_option_fails_before_work(self):
+        """Verify an option the parameters field cannot encode is rejected before execute_command runs."""
+        calls = []
+
+        class PathOptionCommand(ManagedCommand):
+            command_name = "testapp.path_option_command"
+
+            def add_arguments(self, parser):
+                super().add_arguments(parser)
+                parser.add_argument("--path", type=Path)
+
+            def execute_command(self, *args, **options):
+                calls.append(options["path"])
+                CommandExecution.objects.create(command_name="testapp.side_effect")
+
+        with self.assertRaises(TypeError):
+            call_command(PathOptionCommand(), "--path", "/tmp/data", stdout=_STDOUT_NULL)
+
+        self.assertEqual(calls, [])
+        self.assertFalse(CommandExecution.objects.exists())
+
+    def test_failure_recording_error_chains_original_error(self):
+        """Verify the command's own error is kept when recording its failure raises."""
+
+        class FailingCommand(ManagedCommand):
+            command_name = "testapp.failing_record_command"
+
+            def execute_command(self, *args, **options):
+                raise ValueError("Original failure")
+
+        with mock.patch("django_managed_commands.base.record_command_execution", side_effect=RuntimeError("DB down")):
+            with self.assertRaises(RuntimeError) as cm:
+                call_command(FailingCommand(), stdout=_STDOUT_NULL)
+
+        self.assertIsInstance(cm.exception.__cause__, ValueError)
+        self.assertEqual(str(cm.exception.__cause__), "Original failure")
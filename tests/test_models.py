@@ -4,12 +4,34 @@ Tests for CommandExecution model.
 This is the RED phase of TDD - these tests should FAIL because the model
 is not yet implemented.
 """
-from django.test import TestCase
+import dataclasses
+import enum
+import json
+import uuid
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import SimpleTestCase, TestCase
 from django.utils import timezone
 
+from django_managed_commands import encoders
+from django_managed_commands.encoders import ParametersJSONEncoder
 from django_managed_commands.models import CommandExecution
 
 
+class _Color(enum.Enum):
+    RED = "red"
+
+
+@dataclasses.dataclass
+class _Point:
+    x: int
+    at: datetime
+
+
 class CommandExecutionModelTest(TestCase):
     """Test suite for CommandExecution model."""
 
@@ -42,49 +64,16 @@ class CommandExecutionModelTest(TestCase):
         self.assertEqual(execution.duration, duration)
         self.assertFalse(execution.run_once)
 
-    def test_command_name_field(self):
-        """Test command_name CharField has max_length=255."""
-        execution = CommandExecution.objects.create(
-            command_name="a" * 255
-        )
-        self.assertEqual(len(execution.command_name), 255)
-
-        # Verify field properties
-        field = CommandExecution._meta.get_field('command_name')
-        self.assertEqual(field.max_length, 255)
-
-    def test_executed_at_auto_now_add(self):
-        """Test executed_at is automatically set on creation."""
-        before = timezone.now()
-        execution = CommandExecution.objects.create(
-            command_name="test_command"
-        )
-        after = timezone.now()
-
-        self.assertIsNotNone(execution.executed_at)
-        self.assertGreaterEqual(execution.executed_at, before)
-        self.assertLessEqual(execution.executed_at, after)
-
-        # Verify field has auto_now_add
-        field = CommandExecution._meta.get_field('executed_at')
-        self.assertTrue(field.auto_now_add)
-
-    def test_success_default_true(self):
-        """Test success field defaults to True."""
+    def test_field_defaults_on_create(self):
+        """Test fields left unset take their defaults when a row is created."""
         execution = CommandExecution.objects.create(
             command_name="test_command"
         )
         self.assertTrue(execution.success)
-
-        # Verify field default
-        field = CommandExecution._meta.get_field('success')
-        self.assertTrue(field.default)
-
-    def test_parameters_jsonfield_default(self):
-        """Test parameters JSONField defaults to None (nullable)."""
-        execution = CommandExecution.objects.create(
-            command_name="test_command"
-        )
+        self.assertEqual(execution.output, "")
+        self.assertEqual(execution.error_message, "")
+        self.assertIsNone(execution.duration)
+        self.assertFalse(execution.run_once)
         # Parameters is nullable, so it defaults to None
         self.assertIsNone(execution.parameters)
 
@@ -103,64 +92,100 @@ class CommandExecutionModelTest(TestCase):
             parameters=complex_params
         )
 
-        # Refresh from database to ensure JSON serialization works
-        execution.refresh_from_db()
-        self.assertEqual(execution.parameters, complex_params)
-
-    def test_output_field_blank(self):
-        """Test output field can be blank."""
-        execution = CommandExecution.objects.create(
-            command_name="test_command"
-        )
-        self.assertEqual(execution.output, "")
-
-        # Verify field allows blank
-        field = CommandExecution._meta.get_field('output')
-        self.assertTrue(field.blank)
-
-    def test_error_message_field_blank(self):
-        """Test error_message field can be blank."""
-        execution = CommandExecution.objects.create(
-            command_name="test_command"
-        )
-        self.assertEqual(execution.error_message, "")
-
-        # Verify field allows blank
-        field = CommandExecution._meta.get_field('error_message')
-        self.assertTrue(field.blank)
+        # Read back from database to ensure JSON serialization works
+        stored = CommandExecution.objects.values_list("parameters", flat=True).get(pk=execution.pk)
+        self.assertEqual(stored, complex_params)
 
-    def test_duration_field_nullable(self):
-        """Test duration field can be null."""
-        execution = CommandExecution.objects.create(
-            command_name="test_command"
+    def test_ordering(self):
+        """Test default ordering is by -executed_at (newest first)."""
+        # Create executions, then set distinct timestamps explicitly
+        now = timezone.now()
+        # (bulk_create() does not set pks on every backend, so rows are matched by command_name)
+        CommandExecution.objects.bulk_create(
+            [CommandExecution(command_name="old_command"), CommandExecution(command_name="new_command")]
         )
-        self.assertIsNone(execution.duration)
+        CommandExecution.objects.filter(command_name="old_command").update(executed_at=now - timedelta(seconds=1))
+        CommandExecution.objects.filter(command_name="new_command").update(executed_at=now)
 
-        # Verify field allows null
-        field = CommandExecution._meta.get_field('duration')
-        self.assertTrue(field.null)
-        self.assertTrue(field.blank)
-
-        # Test setting duration (as float in seconds)
-        execution.duration = 10.0
-        execution.save()
-        execution.refresh_from_db()
-        self.assertEqual(execution.duration, 10.0)
+        # Query all executions
+        command_names = list(CommandExecution.objects.values_list("command_name", flat=True))
 
-    def test_run_once_default_false(self):
-        """Test run_once field defaults to False."""
-        execution = CommandExecution.objects.create(
-            command_name="test_command"
-        )
-        self.assertFalse(execution.run_once)
+        # Newest should be first
+        self.assertEqual(command_names, ["new_command", "old_command"])
+
+
+class CommandExecutionModelIntrospectionTest(SimpleTestCase):
+    """Checks on CommandExecution's definition that need no database access."""
+
+    def test_field_definitions(self):
+        """Test field options and Meta ordering on CommandExecution."""
+        checks = [
+            ("command_name", "max_length", 255),
+            ("executed_at", "auto_now_add", True),
+            ("success", "default", True),
+            ("output", "blank", True),
+            ("error_message", "blank", True),
+            ("duration", "null", True),
+            ("duration", "blank", True),
+            ("run_once", "default", False),
+        ]
+        for field_name, attr, expected in checks:
+            with self.subTest(field=field_name, attr=attr):
+                self.assertEqual(getattr(CommandExecution._meta.get_field(field_name), attr), expected)
+
+        self.assertEqual(CommandExecution._meta.ordering, ["-executed_at"])
+
+    def test_history_index_present(self):
+        """Test the indexes backing get_command_history and should_run_command are declared."""
+        index_fields = {tuple(index.fields) for index in CommandExecution._meta.indexes}
+        self.assertIn(("command_name", "-executed_at"), index_fields)
+        self.assertIn(("command_name", "run_once", "success"), index_fields)
+
+    def test_parameters_encoder(self):
+        """Test parameters are encoded with ParametersJSONEncoder, falling back to json when needed."""
+        field = CommandExecution._meta.get_field('parameters')
+        self.assertIs(field.encoder, ParametersJSONEncoder)
+
+        encoder = ParametersJSONEncoder()
+        self.assertEqual(json.loads(encoder.encode({"a": [1, 2]})), {"a": [1, 2]})
+        # orjson rejects non-string keys; the standard encoder converts them
+        self.assertEqual(json.loads(encoder.encode({1: "one"})), {"1": "one"})
+
+    def test_parameters_encoder_formats_match_fallback(self):
+        """Test dates, decimals, UUIDs, enums, dataclasses and NaN encode the same with and without orjson."""
+        when = datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc)
+        value = {
+            "when": when,
+            "day": date(2024, 1, 2),
+            "amount": Decimal("1.50"),
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "color": _Color.RED,
+            "point": _Point(1, when),
+            "missing": float("nan"),
+            "limits": [float("inf"), 2.5],
+        }
+        django_encoded = json.loads(DjangoJSONEncoder().encode(when))
+        expected = {
+            "when": django_encoded,
+            "day": "2024-01-02",
+            "amount": "1.50",
+            "id": "12345678-1234-5678-1234-567812345678",
+            "color": "red",
+            "point": {"x": 1, "at": django_encoded},
+            "missing": None,
+            "limits": [None, 2.5],
+        }
 
-        # Verify field default
-        field = CommandExecution._meta.get_field('run_once')
-        self.assertFalse(field.default)
+        self.assertEqual(json.loads(ParametersJSONEncoder().encode(value)), expected)
+        # Without orjson, and for values orjson rejects, DjangoJSONEncoder is used directly
+        with mock.patch.object(encoders, "orjson", None):
+            self.assertEqual(json.loads(ParametersJSONEncoder().encode(value)), expected)
+        self.assertEqual(json.loads(ParametersJSONEncoder().encode({1: value})), {"1": expected})
 
     def test_str_method(self):
         """Test __str__ returns meaningful string representation."""
-        execution = CommandExecution.objects.create(
+        # __str__ needs no database access, so an unsaved instance is enough
+        execution = CommandExecution(
             command_name="test_command",
             success=True
         )
@@ -172,31 +197,3 @@ class CommandExecutionModelTest(TestCase):
         self.assertTrue(
             any(word in str_repr.lower() for word in ["success", "true", "✓"])
         )
-
-    def test_ordering(self):
-        """Test default ordering is by -executed_at (newest first)."""
-        # Create executions with different timestamps
-        old_execution = CommandExecution.objects.create(
-            command_name="old_command"
-        )
-
-        # Small delay to ensure different timestamps
-        import time
-        time.sleep(0.01)
-
-        new_execution = CommandExecution.objects.create(
-            command_name="new_command"
-        )
-
-        # Query all executions
-        executions = list(CommandExecution.objects.all())
-
-        # Newest should be first
-        self.assertEqual(executions[0].id, new_execution.id)
-        self.assertEqual(executions[1].id, old_execution.id)
-
-        # Verify Meta ordering
-        self.assertEqual(
-            CommandExecution._meta.ordering,
-            ['-executed_at']
-        )
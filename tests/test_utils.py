@@ -1,14 +1,25 @@
+import os
+import unittest
 from datetime import timedelta
+from unittest import mock
 
-from django.test import TestCase
+from django.core.management.sql import emit_post_migrate_signal
+from django.db.models.signals import post_save
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.utils import timezone
 
+from django_managed_commands import utils
 from django_managed_commands.models import CommandExecution
 from django_managed_commands.utils import (
+    clear_should_run_cache,
+    flush_command_executions,
     get_command_history,
+    preload_should_run_cache,
     record_command_execution,
+    record_command_executions,
     should_run_command,
 )
+from tests.helpers import wipe_executions
 
 
 class UtilityFunctionsTest(TestCase):
@@ -16,7 +27,9 @@ class UtilityFunctionsTest(TestCase):
 
     def setUp(self):
         """Clear any existing command execution records before each test"""
-        CommandExecution.objects.all().delete()
+        wipe_executions()
+        clear_should_run_cache()
+        self.addCleanup(clear_should_run_cache)
 
     # Tests for record_command_execution()
     def test_record_execution_creates_record(self):
@@ -73,52 +86,153 @@ class UtilityFunctionsTest(TestCase):
         self.assertIsInstance(result, CommandExecution)
         self.assertIsNotNone(result.pk)  # Should be saved to database
 
-    # Tests for should_run_command()
-    def test_should_run_command_no_previous_execution(self):
-        """Test that should_run_command returns True when command has never been run"""
-        result = should_run_command("never_run_command")
+    @mock.patch.object(utils, "_ensure_writer")
+    def test_record_execution_buffered_until_flush(self, ensure_writer):
+        """Test that immediate=False defers the INSERT until the queue is flushed"""
+        record_command_execution("buffered_command", immediate=False)
+        record_command_execution("buffered_command", immediate=False)
 
-        self.assertTrue(result)
+        ensure_writer.assert_called()
+        self.assertEqual(CommandExecution.objects.count(), 0)
 
-    def test_should_run_command_repeatable(self):
-        """Test that should_run_command returns True when run_once=False"""
-        # Create a previous execution with run_once=False
-        CommandExecution.objects.create(
-            command_name="repeatable_command",
-            success=True,
-            run_once=False,
-        )
+        self.assertTrue(flush_command_executions())
 
-        result = should_run_command("repeatable_command")
+        self.assertEqual(CommandExecution.objects.filter(command_name="buffered_command").count(), 2)
 
-        self.assertTrue(result)
+    def test_record_execution_fast_skips_signals(self):
+        """Test that fast=True inserts the record without save() signals"""
+        received = []
 
-    def test_should_run_command_run_once_executed(self):
-        """Test that should_run_command returns False when run_once=True and already executed successfully"""
-        # Create a successful execution with run_once=True
-        CommandExecution.objects.create(
-            command_name="run_once_command",
-            success=True,
-            run_once=True,
-        )
+        def receiver(**kwargs):
+            received.append(kwargs["instance"])
 
-        result = should_run_command("run_once_command")
+        post_save.connect(receiver, sender=CommandExecution)
+        self.addCleanup(post_save.disconnect, receiver, sender=CommandExecution)
 
-        self.assertFalse(result)
+        with self.assertNumQueries(1):
+            result = record_command_execution("fast_command", parameters={"key": "value"}, duration=1.5, fast=True)
 
-    def test_should_run_command_run_once_failed(self):
-        """Test that should_run_command returns True when run_once=True but previous run failed"""
-        # Create a failed execution with run_once=True
-        CommandExecution.objects.create(
-            command_name="failed_once_command",
-            success=False,
-            run_once=True,
-            error_message="Something went wrong",
+        self.assertIsNone(result.pk)
+        self.assertEqual(received, [])
+        record = CommandExecution.objects.get(command_name="fast_command")
+        self.assertEqual(record.parameters, {"key": "value"})
+        self.assertEqual(record.duration, 1.5)
+        self.assertIsNotNone(record.executed_at)
+
+    @override_settings(MANAGED_COMMANDS_MAX_OUTPUT=10)
+    def test_record_execution_truncates_long_text(self):
+        """Test that output and error_message are cut down to MANAGED_COMMANDS_MAX_OUTPUT"""
+        result = record_command_execution("chatty_command", output="x" * 15, error_message="short")
+
+        self.assertEqual(result.output, "x" * 10 + "\n[truncated 5 characters]")
+        self.assertEqual(result.error_message, "short")
+
+        bulk = record_command_executions([{"command_name": "chatty_command", "error_message": "e" * 11}])
+        self.assertEqual(bulk[0].error_message, "e" * 10 + "\n[truncated 1 characters]")
+
+    def test_record_executions_bulk(self):
+        """Test that record_command_executions saves all records with one INSERT"""
+        with self.assertNumQueries(3):  # SAVEPOINT, INSERT, RELEASE SAVEPOINT
+            result = record_command_executions(
+                [
+                    {"command_name": "bulk_a", "duration": 1.0},
+                    {"command_name": "bulk_b", "success": False, "error_message": "boom"},
+                ]
+            )
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual(CommandExecution.objects.count(), 2)
+        self.assertEqual(CommandExecution.objects.get(command_name="bulk_b").error_message, "boom")
+        self.assertEqual(record_command_executions([]), [])
+
+    # Tests for should_run_command()
+    def test_should_run_command_matrix(self):
+        """Test should_run_command across never-run, repeatable, run_once and failed run_once commands"""
+        CommandExecution.objects.bulk_create(
+            [
+                CommandExecution(command_name="repeatable_command", success=True, run_once=False),
+                CommandExecution(command_name="run_once_command", success=True, run_once=True),
+                CommandExecution(
+                    command_name="failed_once_command",
+                    success=False,
+                    run_once=True,
+                    error_message="Something went wrong",
+                ),
+            ]
         )
 
-        result = should_run_command("failed_once_command")
+        cases = [
+            ("never_run_command", True),
+            ("repeatable_command", True),
+            ("run_once_command", False),
+            ("failed_once_command", True),
+        ]
+        for command_name, expected in cases:
+            with self.subTest(command_name=command_name):
+                # The cache is cleared in setUp, so each answer takes exactly one query
+                with self.assertNumQueries(1):
+                    self.assertIs(should_run_command(command_name), expected)
+
+    def test_should_run_command_run_once_executed_before_other_runs(self):
+        """Test that a successful run_once execution is honoured even if it is not the latest one"""
+        CommandExecution.objects.create(command_name="mixed_command", success=True, run_once=True)
+        CommandExecution.objects.create(command_name="mixed_command", success=False, run_once=False)
+
+        self.assertFalse(should_run_command("mixed_command"))
+
+    def test_should_run_command_caches_committed_run_once(self):
+        """Test that a committed successful run_once execution is served from the cache"""
+        with self.captureOnCommitCallbacks(execute=True):
+            record_command_execution("cached_command", success=True, run_once=True)
+
+        with self.assertNumQueries(0):
+            self.assertFalse(should_run_command("cached_command"))
+
+    def test_should_run_command_ignores_uncommitted_executions(self):
+        """Test that executions which are never committed do not populate the cache"""
+        record_command_execution("rolled_back_command", success=True, run_once=True)
+        self.assertFalse(should_run_command("rolled_back_command"))
+
+        CommandExecution.objects.filter(command_name="rolled_back_command").delete()
 
-        self.assertTrue(result)
+        self.assertTrue(should_run_command("rolled_back_command"))
+
+    def test_should_run_cache_forgets_deleted_executions(self):
+        """Test that deleting a command's executions lets it run again without clearing the cache"""
+        with self.captureOnCommitCallbacks(execute=True):
+            record_command_execution("deleted_command", success=True, run_once=True)
+            record_command_execution("kept_command", success=True, run_once=True)
+        self.assertFalse(should_run_command("deleted_command"))
+
+        CommandExecution.objects.filter(command_name="deleted_command").delete()
+
+        self.assertTrue(should_run_command("deleted_command"))
+        with self.assertNumQueries(0):
+            self.assertFalse(should_run_command("kept_command"))
+
+    def test_should_run_cache_cleared_by_flush(self):
+        """Test that the post_migrate signal sent by flush clears the cache"""
+        with self.captureOnCommitCallbacks(execute=True):
+            record_command_execution("flushed_command", success=True, run_once=True)
+
+        emit_post_migrate_signal(verbosity=0, interactive=False, db=CommandExecution.objects.db)
+
+        self.assertEqual(utils._should_run_cache, {})
+
+    def test_preload_should_run_cache(self):
+        """Test that preloading answers should_run_command for already-run commands without queries"""
+        CommandExecution.objects.create(command_name="preloaded_a", success=True, run_once=True)
+        CommandExecution.objects.create(command_name="preloaded_a", success=True, run_once=True)
+        CommandExecution.objects.create(command_name="preloaded_b", success=True, run_once=True)
+        CommandExecution.objects.create(command_name="not_preloaded", success=False, run_once=True)
+
+        with self.assertNumQueries(1), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(preload_should_run_cache(), 2)
+
+        with self.assertNumQueries(0):
+            self.assertFalse(should_run_command("preloaded_a"))
+            self.assertFalse(should_run_command("preloaded_b"))
+        self.assertTrue(should_run_command("not_preloaded"))
 
     # Tests for get_command_history()
     def test_get_command_history_returns_queryset(self):
@@ -135,58 +249,115 @@ class UtilityFunctionsTest(TestCase):
     def test_get_command_history_filters_by_name(self):
         """Test that get_command_history only returns records for the specified command"""
         # Create records for different commands
-        CommandExecution.objects.create(command_name="command_a", success=True)
-        CommandExecution.objects.create(command_name="command_a", success=False)
-        CommandExecution.objects.create(command_name="command_b", success=True)
-        CommandExecution.objects.create(command_name="command_c", success=True)
+        CommandExecution.objects.bulk_create(
+            [
+                CommandExecution(command_name=name, success=success)
+                for name, success in [
+                    ("command_a", True),
+                    ("command_a", False),
+                    ("command_b", True),
+                    ("command_c", True),
+                ]
+            ]
+        )
 
-        result = get_command_history("command_a")
+        with self.assertNumQueries(1):
+            names = list(get_command_history("command_a").values_list("command_name", flat=True))
 
-        self.assertEqual(result.count(), 2)
-        for record in result:
-            self.assertEqual(record.command_name, "command_a")
+        self.assertCountEqual(names, ["command_a", "command_a"])
 
     def test_get_command_history_limit(self):
         """Test that get_command_history respects the limit parameter"""
         # Create 15 records for the same command
-        for i in range(15):
-            CommandExecution.objects.create(
-                command_name="limited_command",
-                success=True,
-            )
+        CommandExecution.objects.bulk_create(
+            [CommandExecution(command_name="limited_command", success=True) for _ in range(15)]
+        )
 
         result = get_command_history("limited_command", limit=5)
 
         self.assertEqual(result.count(), 5)
 
+    def test_get_command_history_fields(self):
+        """Test that get_command_history only loads the requested fields"""
+        CommandExecution.objects.create(command_name="fields_command", output="x" * 1000)
+
+        result = get_command_history("fields_command", fields=["executed_at", "success"])
+
+        deferred = result[0].get_deferred_fields()
+        self.assertIn("output", deferred)
+        self.assertIn("parameters", deferred)
+        self.assertNotIn("success", deferred)
+
     def test_get_command_history_ordering(self):
         """Test that get_command_history returns records ordered by -executed_at (newest first)"""
         now = timezone.now()
 
-        # Create records with different timestamps
-        old_record = CommandExecution.objects.create(
-            command_name="ordered_command",
-            success=True,
+        # Create records, then set timestamps with update() since auto_now_add overrides them on insert.
+        # bulk_create() does not set pks on every backend, so records are told apart by their output.
+        hours_ago = {"old": 2, "middle": 1, "new": 0}
+        CommandExecution.objects.bulk_create(
+            [CommandExecution(command_name="ordered_command", success=True, output=label) for label in hours_ago]
         )
-        old_record.executed_at = now - timedelta(hours=2)
-        old_record.save()
+        for label, hours in hours_ago.items():
+            CommandExecution.objects.filter(command_name="ordered_command", output=label).update(
+                executed_at=now - timedelta(hours=hours)
+            )
 
-        middle_record = CommandExecution.objects.create(
-            command_name="ordered_command",
-            success=True,
-        )
-        middle_record.executed_at = now - timedelta(hours=1)
-        middle_record.save()
+        outputs = list(get_command_history("ordered_command").values_list("output", flat=True))
 
-        new_record = CommandExecution.objects.create(
-            command_name="ordered_command",
-            success=True,
-        )
-        new_record.executed_at = now
-        new_record.save()
+        self.assertEqual(outputs, ["new", "middle", "old"])
 
-        result = list(get_command_history("ordered_command"))
 
-        self.assertEqual(result[0].pk, new_record.pk)
-        self.assertEqual(result[1].pk, middle_record.pk)
-        self.assertEqual(result[2].pk, old_record.pk)
+class BackgroundWriterTest(TransactionTestCase):
+    """Test suite for the background thread writing buffered executions"""
+
+    def setUp(self):
+        """Stop the writer thread after each test so it cannot consume later tests' queued items"""
+        self.addCleanup(utils._stop_writer)
+
+    def test_background_writer_saves_buffered_executions(self):
+        """Test that queued executions are written without an explicit flush from the caller"""
+        for _ in range(3):
+            record_command_execution("background_command", immediate=False)
+
+        utils._write_queue.join()
+
+        self.assertEqual(CommandExecution.objects.filter(command_name="background_command").count(), 3)
+        self.assertTrue(flush_command_executions(timeout=0))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires os.fork()")
+    def test_forked_child_starts_with_empty_writer_state(self):
+        """Test that a forked child neither rewrites the parent's queued executions nor inherits held locks"""
+        with mock.patch.object(utils, "_ensure_writer"):
+            record_command_execution("forked_command", immediate=False)
+
+        with utils._WRITER_LOCK:
+            pid = os.fork()
+            if pid == 0:  # pragma: no cover - runs in the child process
+                clean = (
+                    utils._write_queue.empty()
+                    and utils._writer_thread is None
+                    and utils._WRITER_LOCK.acquire(blocking=False)
+                )
+                os._exit(0 if clean else 1)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.WEXITSTATUS(status), 0)
+
+        # The parent's queue is untouched and is still written by the parent
+        self.assertTrue(flush_command_executions(timeout=0))
+        self.assertEqual(CommandExecution.objects.filter(command_name="forked_command").count(), 1)
+
+    def test_flush_reports_batches_dropped_by_background_writer(self):
+        """Test that flush_command_executions returns False when the writer failed to save a batch"""
+        with mock.patch.object(utils, "_write_executions", side_effect=RuntimeError("database table is locked")):
+            with self.assertLogs(utils.logger, "ERROR"):
+                for _ in range(2):
+                    record_command_execution("dropped_command", immediate=False)
+                utils._write_queue.join()
+
+        self.assertFalse(flush_command_executions(timeout=0))
+        self.assertFalse(CommandExecution.objects.filter(command_name="dropped_command").exists())
+
+        # The failure is reported once; later flushes only cover what happened since
+        self.assertTrue(flush_command_executions(timeout=0))